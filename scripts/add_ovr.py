@@ -1,10 +1,17 @@
 import json
 import os
+from heapq import nlargest
+from operator import itemgetter
+import numpy as np
 
 # 1. SETUP PATHS
 script_dir = os.path.dirname(os.path.abspath(__file__))
 input_path = os.path.join(script_dir, '..', 'data', 'players_with_badges.json')
 
+# The 6 core stats that make up OVR
+CORE_KEYS = ['attr_Finishing', 'attr_Shooting', 'attr_Defense',
+             'attr_Rebounding', 'attr_Playmaking', 'attr_Stamina']
+
 # 2. LOAD DATA
 try:
     with open(input_path, 'r') as f:
@@ -15,28 +22,22 @@ except FileNotFoundError:
     exit()
 
 # 3. CALCULATE OVR
-for p in players:
-    # We take the average of the 6 core stats
-    total_stats = (
-        p.get('attr_Finishing', 0) +
-        p.get('attr_Shooting', 0) +
-        p.get('attr_Defense', 0) +
-        p.get('attr_Rebounding', 0) +
-        p.get('attr_Playmaking', 0) +
-        p.get('attr_Stamina', 0)
-    )
-    
-    # Round to nearest whole number
-    p['ovr'] = int(round(total_stats / 6))
+# We take the average of the 6 core stats (one (N, 6) array, one pass)
+attrs = np.array([[p.get(k, 0) for k in CORE_KEYS] for p in players], dtype=np.float32).reshape(-1, len(CORE_KEYS))
+
+# Round to nearest whole number
+ovrs = np.rint(attrs.sum(axis=1) / len(CORE_KEYS)).astype(np.int16)
+for p, ovr in zip(players, ovrs.tolist()):
+    p['ovr'] = ovr
 
 # 4. SAVE
 with open(input_path, 'w') as f:
-    json.dump(players, f, indent=2)
+    f.write(json.dumps(players, indent=2))
 
 print("Success! OVR added to all players.")
 
 # 5. PREVIEW TOP 5 PLAYERS
 print("\n--- TOP 5 PLAYERS BY OVR ---")
-players.sort(key=lambda x: x['ovr'], reverse=True)
-for p in players[:5]:
-    print(f"{p['ovr']} OVR - {p['Player']} ({p['Team']})")
\ No newline at end of file
+# Partial sort: only the top 5 need ordering (ties keep file order, players list untouched)
+for p in nlargest(5, players, key=itemgetter('ovr')):
+    print(f"{p['ovr']} OVR - {p['Player']} ({p['Team']})")
@@ -1,5 +1,7 @@
 import json
 import os
+from operator import itemgetter
+import numpy as np
 
 # 1. SETUP
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,61 +17,62 @@ except FileNotFoundError:
     exit()
 
 # 3. DEFINE BADGE LOGIC
-def calculate_badges(p):
-    badges = []
-    
-    # ATTRIBUTES (Safe .get defaults to 0 if missing)
-    finishing = p.get('attr_Finishing', 0)
-    shooting = p.get('attr_Shooting', 0)
-    defense = p.get('attr_Defense', 0)
-    rebounding = p.get('attr_Rebounding', 0)
-    playmaking = p.get('attr_Playmaking', 0)
-    stamina = p.get('attr_Stamina', 0)
-    
+# Each badge is a set of attribute floors; a player earns it when every floor is met
+BADGE_RULES = [
     # 1. SNIPER (Elite Shooting)
-    if shooting >= 90:
-        badges.append("Sniper")
-        
+    ("Sniper", {'attr_Shooting': 90}),
     # 2. LOCKDOWN (Elite Defense)
-    if defense >= 85:
-        badges.append("Lockdown")
-        
+    ("Lockdown", {'attr_Defense': 85}),
     # 3. FLOOR GENERAL (Elite Playmaking)
-    if playmaking >= 90:
-        badges.append("Floor General")
-        
+    ("Floor General", {'attr_Playmaking': 90}),
     # 4. GLASS CLEANER (Elite Rebounding)
-    if rebounding >= 90:
-        badges.append("Glass Cleaner")
-        
+    ("Glass Cleaner", {'attr_Rebounding': 90}),
     # 5. POST POWERHOUSE (Elite Inside Scoring)
-    if finishing >= 95:
-        badges.append("Post Powerhouse")
-        
+    ("Post Powerhouse", {'attr_Finishing': 95}),
     # 6. WORKHORSE (High Stamina + Defense)
-    if stamina >= 90 and defense >= 75:
-        badges.append("Workhorse")
-        
+    ("Workhorse", {'attr_Stamina': 90, 'attr_Defense': 75}),
     # 7. OFFENSIVE ENGINE (Great All-Around Scorer)
-    if finishing >= 80 and shooting >= 80 and playmaking >= 80:
-        badges.append("Offensive Engine")
-        
+    ("Offensive Engine", {'attr_Finishing': 80, 'attr_Shooting': 80, 'attr_Playmaking': 80}),
     # 8. THE ERASER (Blocks)
     # We check if they are a Center/Forward with high defense
     # (Since we don't track BLK attribute directly, we use Defense + Height as a proxy)
-    if defense >= 88 and p.get('height_in', 0) >= 76:
-        badges.append("The Eraser")
+    ("The Eraser", {'attr_Defense': 88, 'height_in': 76}),
+]
 
-    return badges
+# Attribute columns pulled once per run (Safe .get defaults to 0 if missing)
+ATTR_KEYS = ['attr_Finishing', 'attr_Shooting', 'attr_Defense', 'attr_Rebounding',
+             'attr_Playmaking', 'attr_Stamina', 'height_in']
+BADGE_NAMES = [name for name, _ in BADGE_RULES]
+
+# Decision table (badges x attributes), built once; -inf where a badge ignores the attribute
+BADGE_THRESHOLDS = np.full((len(BADGE_RULES), len(ATTR_KEYS)), -np.inf)
+for i, (_, floors) in enumerate(BADGE_RULES):
+    for key, floor in floors.items():
+        BADGE_THRESHOLDS[i, ATTR_KEYS.index(key)] = floor
+
+get_attrs = itemgetter(*ATTR_KEYS)
+
+def calculate_badge_masks(players):
+    # ATTRIBUTES as a (players x attributes) matrix
+    # Scraper output always has every key, so read them directly; only fall back to .get if one is missing
+    try:
+        rows = [get_attrs(p) for p in players]
+    except KeyError:
+        rows = [[p.get(k, 0) for k in ATTR_KEYS] for p in players]
+    attrs = np.array(rows, dtype=float).reshape(-1, len(ATTR_KEYS))
+
+    # One broadcast compare against the table -> (players x badges)
+    return (attrs[:, None, :] >= BADGE_THRESHOLDS[None, :, :]).all(axis=2)
 
 # 4. APPLY BADGES (Safe Update)
-for player in players:
+masks = calculate_badge_masks(players)
+for player, has_badge in zip(players, masks.tolist()):
     # We simply update the 'badges' key. We DO NOT create a new dictionary.
     # This ensures 'Pos', 'attr_Discipline', etc. are preserved.
-    player['badges'] = calculate_badges(player)
+    player['badges'] = [name for name, has in zip(BADGE_NAMES, has_badge) if has]
 
 # 5. SAVE
 with open(data_path, 'w') as f:
-    json.dump(players, f, indent=2)
+    f.write(json.dumps(players, indent=2))
 
 print(f"Success! Badges assigned to {len(players)} players (Data Preserved).")
\ No newline at end of file
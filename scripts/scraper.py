@@ -3,6 +3,7 @@ import numpy as np
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # 1. SETUP
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,29 +13,51 @@ years = [2022, 2023, 2024, 2025]
 weights = {2025: 4.0, 2024: 3.0, 2023: 2.0, 2022: 1.0}
 data_frames = {}
 
+URL = "https://www.basketball-reference.com/wnba/years/{year}_per_game.html"
+REQUEST_GAP_S = 2  # keep requests 2s apart so the site never sees a burst
+
+# Raw tables are cached for a day so re-runs skip the network
+CACHE_DIR = os.path.join(script_dir, '..', 'data', 'cache')
+CACHE_MAX_AGE_S = 24 * 60 * 60
+
+def fetch_year(year):
+    cache_path = os.path.join(CACHE_DIR, f"{year}_per_game.pkl")
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_MAX_AGE_S:
+        print(f"Loading {year} WNBA table from cache...")
+        return pd.read_pickle(cache_path)
+
+    # Staggered start instead of sleeping after each download
+    time.sleep(REQUEST_GAP_S * years.index(year))
+    print(f"Connecting to {year} WNBA Database...")
+    dfs = pd.read_html(URL.format(year=year))
+    df = dfs[0]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_pickle(cache_path)
+    return df
+
 # 2. SCRAPE LOOP
+# Downloads overlap in threads; cleaning runs afterwards, year by year
+with ThreadPoolExecutor(max_workers=len(years)) as ex:
+    pending = {year: ex.submit(fetch_year, year) for year in years}
+
 for year in years:
-    url = f"https://www.basketball-reference.com/wnba/years/{year}_per_game.html"
-    print(f"Connecting to {year} WNBA Database...")
     try:
-        dfs = pd.read_html(url)
-        df = dfs[0]
+        df = pending[year].result()
         df = df[df['Player'] != 'Player']
         
         # NUMERIC CLEANING
         cols = ['G', 'MP', 'FG%', '3P', '3P%', 'TRB', 'AST', 'STL', 'BLK', 'PTS', 'PF', 'FT%']
-        for col in cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df = df.replace([np.inf, -np.inf], np.nan).fillna(0)
+        # Bad cells coerce to NaN; only the stat block needs filling
+        df[cols] = df[cols].apply(pd.to_numeric, errors='coerce').fillna(0.0)
         
         if 'Pos' in df.columns:
             df['Pos'] = df['Pos'].astype(str).replace('nan', np.nan)
         
-        df = df.sort_values('G', ascending=False).drop_duplicates('Player')
+        # Keep each player's max-G row (traded players have one row per team)
+        df = df.loc[df.groupby('Player', sort=False)['G'].idxmax()]
         df.set_index('Player', inplace=True)
         data_frames[year] = df
-        time.sleep(2) 
     except Exception as e:
         print(f"Error scraping {year}: {e}")
 
@@ -46,6 +69,9 @@ if 2025 not in data_frames: exit()
 # We do NOT concatenate missing players from previous years anymore.
 final_df = data_frames[2025].copy()
 
+# Align every year to the 2025 roster once; the position backfill and the stat blend both read these
+aligned = {year: data_frames[year].reindex(final_df.index) for year in years if year in data_frames}
+
 # === POSITION FIX ===
 if 'Pos' not in final_df.columns:
     final_df['Pos'] = np.nan
@@ -53,33 +79,35 @@ if 'Pos' not in final_df.columns:
 # We still LOOK at old years to fill gaps for CURRENT players,
 # but we do not add new players.
 for year in [2024, 2023, 2022]:
-    if year in data_frames and 'Pos' in data_frames[year].columns:
-        final_df['Pos'] = final_df['Pos'].fillna(data_frames[year]['Pos'])
+    if year in aligned and 'Pos' in aligned[year].columns:
+        final_df['Pos'] = final_df['Pos'].fillna(aligned[year]['Pos'])
 
 final_df['Pos'] = final_df['Pos'].fillna('G')
-final_df['Pos'] = final_df['Pos'].apply(lambda x: str(x).replace('-', '/'))
+final_df['Pos'] = final_df['Pos'].astype(str).str.replace('-', '/', regex=False)
 # ====================
 
 stat_cols = ['PTS', 'AST', 'TRB', 'STL', 'BLK', '3P', '3P%', 'FG%', 'MP', 'PF', 'FT%']
-for col in stat_cols:
-    final_df[col] = final_df[col].astype(float)
+final_df[stat_cols] = final_df[stat_cols].astype(float)
 
 # Blend stats (Weighted Average)
-for player in final_df.index:
-    for col in stat_cols:
-        numerator = 0.0
-        denominator = 0.0
-        for year in years:
-            if year in data_frames and player in data_frames[year].index:
-                val = data_frames[year].loc[player, col]
-                w = weights[year]
-                numerator += (val * w)
-                denominator += w
-        if denominator > 0:
-            final_df.loc[player, col] = numerator / denominator
+def blend_stats(V, M, W):
+    # V: (years, players, stats) values, M: same shape "has a value that year", W: (years,) weights
+    w = W[:, None, None] * M
+    numerator = (np.nan_to_num(V) * w).sum(axis=0)
+    denominator = w.sum(axis=0)
+    return numerator, denominator
+
+# Players missing from a year come back from the reindex as NaN, so the mask is just ~isnan
+V = np.stack([aligned[year][stat_cols].to_numpy(dtype=float) for year in aligned])
+M = ~np.isnan(V)
+W = np.array([weights[year] for year in aligned])
+
+numerator, denominator = blend_stats(V, M, W)
+final_df[stat_cols] = np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1.0),
+                               final_df[stat_cols].to_numpy(dtype=float))
 
 # 4. PHYSICALS & ATTRIBUTES
-final_df['height_in'] = final_df['TRB'].apply(lambda x: 70 + int(x) if x < 10 else 78) 
+final_df['height_in'] = np.where(final_df['TRB'] < 10, 70 + final_df['TRB'].astype(int), 78)
 if 'Wt' in final_df.columns:
     final_df['weight_lb'] = pd.to_numeric(final_df['Wt'], errors='coerce').fillna(170)
 else:
@@ -90,11 +118,15 @@ df = final_df
 
 def get_dominance_rating(stat_col):
     if stat_col not in df.columns: return 25
-    league_max = df[stat_col].max()
+    values = df[stat_col].to_numpy(dtype=float)
+    league_max = values.max()
     if league_max == 0: return 25
-    relative_score = df[stat_col] / league_max
-    curved_score = np.power(relative_score, 0.7) 
-    return (25 + (curved_score * 74)).astype(int)
+    # One scratch array, updated in place: relative score -> curve -> 25..99 scale
+    score = values / league_max
+    np.power(score, 0.7, out=score)
+    score *= 74
+    score += 25
+    return score.astype(int)
 
 df['attr_Finishing'] = get_dominance_rating('PTS')
 vol_score = get_dominance_rating('3P')
@@ -118,6 +150,8 @@ df = df.sort_values('ovr', ascending=False)
 df['Player'] = df.index 
 # Reset badges to empty (Use assign_badges.py after this!)
 df['badges'] = [[] for _ in range(len(df))]
+# Team skips the stat fill; a blank one stays 0 as before, since json.dumps would write a bare NaN
+df['Team'] = df['Team'].fillna(0)
 
 roster = df[['Player', 'Team', 'Pos', 'height_in', 'weight_lb', 
              'attr_Finishing', 'attr_Shooting', 'attr_Defense', 
@@ -126,6 +160,6 @@ roster = df[['Player', 'Team', 'Pos', 'height_in', 'weight_lb',
 
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
 with open(output_path, 'w') as f:
-    json.dump(roster, f, indent=2)
+    f.write(json.dumps(roster, indent=2))
 
 print(f"Success! {len(roster)} players processed (Strict 2025 Roster).")
\ No newline at end of file
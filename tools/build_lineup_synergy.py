@@ -3,19 +3,65 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 
 def safe_div(a, b, default=0.0):
-    return a / b if b and b != 0 else default
-
-
-def make_lineup_key(row) -> str:
-    # order-independent lineup key
-    players = [row["p1"], row["p2"], row["p3"], row["p4"], row["p5"]]
-    players = [str(x) for x in players if pd.notna(x) and str(x).strip() != ""]
-    players_sorted = sorted(players)
-    return "|".join(players_sorted)
+    # elementwise a / b over whole columns; default where b is 0
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    nonzero = b != 0
+    return np.where(nonzero, a / np.where(nonzero, b, 1.0), default)
+
+
+PLAYER_COLS = ["p1", "p2", "p3", "p4", "p5"]
+
+# only the columns we consume, parsed straight to their final dtypes
+# (points columns are left to the parser so whole-number totals stay ints in the output)
+STINT_DTYPES = {
+    "season_year": "int32",
+    "game_id": str,
+    "team_id": str,
+    "side": str,
+    "duration_s": "float64",
+    **{c: str for c in PLAYER_COLS},
+}
+TEAM_STYLE_DTYPES = {
+    "team_id": str,
+    "minutes_est": "float64",
+    "fga": "float64",
+    "fta": "float64",
+    "tov": "float64",
+}
+
+
+def sort_lineups(st: pd.DataFrame) -> tuple[pd.Series, pd.DataFrame]:
+    # order-independent lineup key for every row at once, plus the sorted players behind it:
+    # blank slots become "" so the row sort pushes them to the front, then they are rotated to the back
+    players = st[PLAYER_COLS].fillna("").astype(str).to_numpy(dtype=str)
+    players[np.char.strip(players) == ""] = ""
+    players = np.sort(players, axis=1)
+    n_blank = (players == "").sum(axis=1)
+    players = np.take_along_axis(players, (np.arange(len(PLAYER_COLS)) + n_blank[:, None]) % len(PLAYER_COLS), axis=1)
+
+    # join column-wise with numpy string ops (no per-row Python list/join)
+    keys = players[:, 0]
+    for i in range(1, len(PLAYER_COLS)):
+        keys = np.char.add(np.char.add(keys, "|"), players[:, i])
+    keys = np.char.rstrip(keys, "|")
+
+    sorted_players = pd.DataFrame(players, index=st.index, columns=PLAYER_COLS)
+    return pd.Series(keys, index=st.index), sorted_players.where(sorted_players != "")
+
+
+def write_table(df: pd.DataFrame, path: Path, emit: str) -> Path:
+    if emit == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="snappy")
+    else:
+        df.to_csv(path, index=False)
+    return path
 
 
 def load_team_poss_per_min(team_style_csv: Path) -> dict[str, float]:
@@ -24,22 +70,17 @@ def load_team_poss_per_min(team_style_csv: Path) -> dict[str, float]:
     poss ≈ FGA + 0.44*FTA + TOV  (OREB not available here; good enough for pace)
     poss_per_min ≈ poss / minutes_est
     """
-    ts = pd.read_csv(team_style_csv, low_memory=False)
+    needed = set(TEAM_STYLE_DTYPES)
+    ts = pd.read_csv(team_style_csv, usecols=lambda c: c in needed, dtype=TEAM_STYLE_DTYPES)
 
-    needed = {"team_id", "minutes_est", "fga", "fta", "tov"}
     missing = needed - set(ts.columns)
     if missing:
         raise RuntimeError(f"team_style missing {missing}. columns: {ts.columns.tolist()}")
 
-    ts = ts.copy()
-    ts["team_id"] = ts["team_id"].astype(str)
-    ts["minutes_est"] = pd.to_numeric(ts["minutes_est"], errors="coerce").fillna(0.0)
-    ts["fga"] = pd.to_numeric(ts["fga"], errors="coerce").fillna(0.0)
-    ts["fta"] = pd.to_numeric(ts["fta"], errors="coerce").fillna(0.0)
-    ts["tov"] = pd.to_numeric(ts["tov"], errors="coerce").fillna(0.0)
+    ts = ts.fillna({"minutes_est": 0.0, "fga": 0.0, "fta": 0.0, "tov": 0.0})
 
     ts["poss_est"] = ts["fga"] + 0.44 * ts["fta"] + ts["tov"]
-    ts["poss_per_min"] = ts.apply(lambda r: safe_div(r["poss_est"], r["minutes_est"], 0.0), axis=1)
+    ts["poss_per_min"] = safe_div(ts["poss_est"], ts["minutes_est"], 0.0)
 
     # if duplicates, take max minutes_est row
     ts = ts.sort_values("minutes_est", ascending=False).drop_duplicates("team_id", keep="first")
@@ -53,26 +94,23 @@ def main():
     ap.add_argument("--out", required=True, help="Output CSV path, e.g. derived/phase4_lineup_synergy_2025.csv")
     ap.add_argument("--min-minutes", type=float, default=10.0, help="Minimum minutes together to keep a lineup")
     ap.add_argument("--top-n-per-team", type=int, default=0, help="If >0, also write a top-N file per team next to out")
+    ap.add_argument("--emit", choices=["csv", "parquet"], default="csv", help="Output format (parquet replaces the --out suffix)")
     args = ap.parse_args()
 
-    st = pd.read_csv(args.stints, low_memory=False)
+    needed = set(STINT_DTYPES) | {"points_for", "points_against"}
+    st = pd.read_csv(args.stints, usecols=lambda c: c in needed, dtype=STINT_DTYPES)
 
-    needed = {"season_year", "game_id", "team_id", "side", "duration_s", "points_for", "points_against", "p1", "p2", "p3", "p4", "p5"}
     missing = needed - set(st.columns)
     if missing:
         raise RuntimeError(f"stints missing {missing}. columns: {st.columns.tolist()}")
 
-    st = st.copy()
-    st["team_id"] = st["team_id"].astype(str)
-
     # numeric cleanup
-    st["duration_s"] = pd.to_numeric(st["duration_s"], errors="coerce").fillna(0.0)
+    st = st.fillna({"duration_s": 0.0, "points_for": 0.0, "points_against": 0.0})
     st["minutes"] = st["duration_s"] / 60.0
-    st["points_for"] = pd.to_numeric(st["points_for"], errors="coerce").fillna(0.0)
-    st["points_against"] = pd.to_numeric(st["points_against"], errors="coerce").fillna(0.0)
 
     # lineup key
-    st["lineup_key"] = st.apply(make_lineup_key, axis=1)
+    # (p1..p5 are rewritten in key order so each lineup's players can ride through the groupby)
+    st["lineup_key"], st[PLAYER_COLS] = sort_lineups(st)
     st = st[st["lineup_key"].str.len() > 0].copy()
 
     # possessions estimate using team style pace
@@ -80,42 +118,41 @@ def main():
     st["team_poss_per_min"] = st["team_id"].map(poss_per_min).fillna(0.0)
     st["poss_est"] = st["team_poss_per_min"] * st["minutes"]
 
-    # aggregate by team + lineup
+    # aggregate by team + lineup (categorical keys group on int codes; the sort below fixes the row order)
+    st["team_id"] = st["team_id"].astype("category")
+    st["lineup_key"] = st["lineup_key"].astype("category")
     grp_cols = ["season_year", "team_id", "lineup_key"]
-    agg = st.groupby(grp_cols, as_index=False).agg(
+    agg = st.groupby(grp_cols, as_index=False, sort=False, observed=True).agg(
         minutes=("minutes", "sum"),
         stints=("minutes", "count"),
         points_for=("points_for", "sum"),
         points_against=("points_against", "sum"),
         poss_est=("poss_est", "sum"),
+        **{c: (c, "first") for c in PLAYER_COLS},
     )
 
     agg["net_points"] = agg["points_for"] - agg["points_against"]
 
     # per-40 minute rates
-    agg["off_per40"] = agg.apply(lambda r: safe_div(r["points_for"], r["minutes"], 0.0) * 40.0, axis=1)
-    agg["def_per40"] = agg.apply(lambda r: safe_div(r["points_against"], r["minutes"], 0.0) * 40.0, axis=1)
-    agg["net_per40"] = agg.apply(lambda r: safe_div(r["net_points"], r["minutes"], 0.0) * 40.0, axis=1)
+    agg["off_per40"] = safe_div(agg["points_for"], agg["minutes"], 0.0) * 40.0
+    agg["def_per40"] = safe_div(agg["points_against"], agg["minutes"], 0.0) * 40.0
+    agg["net_per40"] = safe_div(agg["net_points"], agg["minutes"], 0.0) * 40.0
 
     # per-100 possession ratings (if poss_est present)
-    agg["off_rating"] = agg.apply(lambda r: safe_div(r["points_for"], r["poss_est"], 0.0) * 100.0, axis=1)
-    agg["def_rating"] = agg.apply(lambda r: safe_div(r["points_against"], r["poss_est"], 0.0) * 100.0, axis=1)
+    agg["off_rating"] = safe_div(agg["points_for"], agg["poss_est"], 0.0) * 100.0
+    agg["def_rating"] = safe_div(agg["points_against"], agg["poss_est"], 0.0) * 100.0
     agg["net_rating"] = agg["off_rating"] - agg["def_rating"]
 
     # pace proxy: possessions per 40
-    agg["pace_poss_per40"] = agg.apply(lambda r: safe_div(r["poss_est"], r["minutes"], 0.0) * 40.0, axis=1)
-
-    # split lineup_key back into players for readability
-    players_split = agg["lineup_key"].str.split("|", expand=True)
-    for i in range(5):
-        col = f"p{i+1}"
-        agg[col] = players_split[i] if i in players_split.columns else pd.NA
+    agg["pace_poss_per40"] = safe_div(agg["poss_est"], agg["minutes"], 0.0) * 40.0
 
     # filter small samples
     agg = agg[agg["minutes"] >= args.min_minutes].copy()
 
-    # sort: best chemistry = net_rating then net_per40 then minutes
-    agg = agg.sort_values(["team_id", "net_rating", "net_per40", "minutes"], ascending=[True, False, False, False])
+    # sort: best chemistry = net_rating then net_per40 then minutes; ties go by lineup_key
+    agg = agg.sort_values(
+        ["team_id", "net_rating", "net_per40", "minutes", "lineup_key"], ascending=[True, False, False, False, True]
+    )
 
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -127,14 +164,14 @@ def main():
         "off_rating","def_rating","net_rating",
         "lineup_key"
     ]
-    agg[cols].to_csv(out_path, index=False)
+    out_path = write_table(agg[cols], out_path, args.emit)
     print(f"wrote {out_path}  (rows={len(agg)})")
 
     # optional: top N per team file
     if args.top_n_per_team and args.top_n_per_team > 0:
         topn = agg.groupby("team_id", as_index=False).head(args.top_n_per_team).copy()
         top_path = out_path.with_name(out_path.stem + f"_top{args.top_n_per_team}_per_team.csv")
-        topn[cols].to_csv(top_path, index=False)
+        top_path = write_table(topn[cols], top_path, args.emit)
         print(f"wrote {top_path}  (rows={len(topn)})")
 
 
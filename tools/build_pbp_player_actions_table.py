@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 import re
 import unicodedata
+import numpy as np
 import pandas as pd
 
 
@@ -14,11 +16,19 @@ import pandas as pd
 SUFFIX_RE = re.compile(r"\b(jr|sr|ii|iii|iv|v)\b\.?$", re.IGNORECASE)
 
 def norm_name(s: str) -> str:
-    if s is None or pd.isna(s):
+    if s is None or (isinstance(s, float) and s != s):
         return ""
-    s = str(s).strip()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return _norm_name_cached(str(s))
+
+
+@lru_cache(maxsize=None)
+def _norm_name_cached(s: str) -> str:
+    # the same few hundred names repeat across every event field -> normalize each once
+    s = s.strip()
+    # ascii names have nothing to decompose or strip
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(ch for ch in s if not unicodedata.combining(ch))
     s = s.lower().replace("’", "'")
     s = re.sub(r"[^\w\s'-]", "", s)
     s = re.sub(r"\s+", " ", s).strip()
@@ -37,7 +47,7 @@ def load_aliases(path: Path | None) -> dict[str, str]:
     df = pd.read_csv(path)
     if not {"raw","canon"} <= set(df.columns):
         raise RuntimeError("Alias CSV must have columns: raw, canon")
-    return {norm_name(r.raw): norm_name(r.canon) for r in df.itertuples(index=False)}
+    return {norm_name(raw): norm_name(canon) for raw, canon in zip(df["raw"], df["canon"])}
 
 
 # -----------------------------
@@ -49,78 +59,74 @@ def load_phase0(phase0_csv: Path) -> pd.DataFrame:
     missing = need - set(p0.columns)
     if missing:
         raise RuntimeError(f"phase0 missing {missing}. columns={p0.columns.tolist()}")
-    p0 = p0.copy()
     p0["playerId"] = p0["playerId"].astype(str)
     p0["teamId"] = p0["teamId"].astype(str)
     p0["playerName_norm"] = p0["playerName"].map(norm_name)
     return p0
 
 
-def build_name_lookup(p0: pd.DataFrame) -> dict[str, list[tuple[str,str,str]]]:
-    lut = {}
-    for r in p0.itertuples(index=False):
-        k = r.playerName_norm
+def build_name_lookup(p0: pd.DataFrame) -> tuple[dict[str, str], dict[str, list[tuple[str, str]]]]:
+    # unique names map straight to a playerId; shared names keep (playerId, teamId) candidates
+    by_name = {}
+    for k, pid, tid in zip(p0["playerName_norm"], p0["playerId"], p0["teamId"]):
         if k:
-            lut.setdefault(k, []).append((r.playerId, r.teamId, r.playerName))
-    return lut
+            by_name.setdefault(k, []).append((pid, tid))
+    lut_single = {k: c[0][0] for k, c in by_name.items() if len(c) == 1}
+    lut_ambig = {k: c for k, c in by_name.items() if len(c) > 1}
+    return lut_single, lut_ambig
 
 
 def resolve_player_id(raw_name: str, lut, alias_map, preferred_team: str | None) -> str | None:
+    lut_single, lut_ambig = lut
     n = norm_name(raw_name)
     n = alias_map.get(n, n)
-    cands = lut.get(n, [])
-    if not cands:
-        return None
-    if len(cands) == 1:
-        return cands[0][0]
+    if n in lut_single:
+        return lut_single[n]
     if preferred_team:
-        for pid, tid, _ in cands:
+        for pid, tid in lut_ambig.get(n, ()):
             if tid == preferred_team:
                 return pid
-    # ambiguous -> refuse rather than guess
+    # unknown or ambiguous -> refuse rather than guess
     return None
 
 
 # -----------------------------
 # time + coords
 # -----------------------------
-def clock_to_seconds(clock: str) -> int | None:
-    c = str(clock or "")
-    if ":" not in c:
-        return None
-    try:
-        mm, ss = c.split(":")
-        return int(mm) * 60 + int(ss)
-    except Exception:
-        return None
+RE_CLOCK = re.compile(r"^\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*$")
 
+def clock_to_seconds(clock: pd.Series) -> pd.Series:
+    # "mm:ss" -> seconds for a whole column; anything else -> <NA>
+    parts = clock.astype(str).str.extract(RE_CLOCK)
+    mm = pd.to_numeric(parts[0]).astype("Int64")
+    ss = pd.to_numeric(parts[1]).astype("Int64")
+    return mm * 60 + ss
 
-def normalize_xy_to_hoop(x, y):
+
+def normalize_xy_to_hoop(x: pd.Series, y: pd.Series) -> tuple[np.ndarray, np.ndarray]:
     """
     Your coordinate ranges:
       x: 1..1128  (court width)
       y: 1..600   (court length)
     We normalize to half-court with hoop at (0,0).
+    Works on whole columns; a pair with an unparseable value gives NaN for both.
     """
-    try:
-        x = float(x); y = float(y)
-    except Exception:
-        return None, None
+    xf = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64")
+    yf = pd.to_numeric(y, errors="coerce").to_numpy(dtype="float64")
+    bad = (np.isnan(xf) & x.notna().to_numpy()) | (np.isnan(yf) & y.notna().to_numpy())
 
     # centerline
-    hx = x - 564.0
+    hx = xf - 564.0
 
     # fold court so hoop baseline is always at y=0
     # if y in top half (>300), mirror around 600
-    if y > 300.0:
-        hy = 600.0 - y
-    else:
-        hy = y
+    hy = np.where(yf > 300.0, 600.0 - yf, yf)
 
     # hy now increases outward from hoop
-    if hy < 0:
-        hy = abs(hy)
+    hy = np.abs(hy)
 
+    hx[bad] = np.nan
+    hy[bad] = np.nan
     return hx, hy
 
 
@@ -129,6 +135,7 @@ def normalize_xy_to_hoop(x, y):
 # -----------------------------
 RE_SHOT = re.compile(r"^(.+?)\s+(makes|misses)\s+(two point|three point)\b", re.IGNORECASE)
 RE_FT = re.compile(r"^(.+?)\s+(makes|misses)\s+.*free throw\b", re.IGNORECASE)
+RE_FT_LOOSE = re.compile(r"^(.+?)\s+(makes|misses)\b", re.IGNORECASE)
 RE_ASSIST = re.compile(r"\((.+?)\s+assists\)", re.IGNORECASE)
 
 RE_REB = re.compile(r"^(.+?)\s+(offensive|defensive)\s+rebound\b", re.IGNORECASE)
@@ -141,8 +148,21 @@ RE_BLK = re.compile(r"\((.+?)\s+blocks\)", re.IGNORECASE)
 
 # fouls
 RE_FOUL_LEAD = re.compile(r"^(.+?)\s+.*\bfoul\b", re.IGNORECASE)
-RE_PARENS = re.compile(r"\(([^()]*)\)")
-RE_DRAWS = re.compile(r"^(.+?)\s+draws?\s+the\s+foul\b", re.IGNORECASE)
+# drawer = "(X draws the foul)"; the greedy lead makes the last such parenthetical win
+RE_DRAWS = re.compile(r"(?s:.*)\(\s*([^()\s][^()\n]*?)\s+draws?\s+the\s+foul\b[^()]*\)", re.IGNORECASE)
+
+# every branch needs one of these words in the description; rows without any are dropped up front
+RE_ACTIONABLE = re.compile(r"makes|misses|rebound|turnover|foul", re.IGNORECASE)
+
+# one-pass classifier: each optional lookahead flags whether that branch's text is present,
+# so a single scan of the description replaces the per-branch searches / lowercased substring checks
+RE_KIND = re.compile(
+    r"^(?=(?P<shot>.+?\s+(?:makes|misses)\s+(?:two point|three point)\b))?"
+    r"(?=(?P<ft>(?s:.*?)free throw))?"
+    r"(?=(?P<reb>.+?\s+(?:offensive|defensive)\s+rebound\b))?"
+    r"(?=(?P<tov>(?s:.*?)turnover))?",
+    re.IGNORECASE,
+)
 
 
 def load_game_context(path: Path | None) -> pd.DataFrame | None:
@@ -153,13 +173,233 @@ def load_game_context(path: Path | None) -> pd.DataFrame | None:
     missing = need - set(gc.columns)
     if missing:
         raise RuntimeError(f"game_context missing {missing}. columns={gc.columns.tolist()}")
-    gc = gc.copy()
     gc["game_id"] = gc["game_id"].astype(str)
     gc["home_team_id"] = gc["home_team_id"].astype(str)
     gc["away_team_id"] = gc["away_team_id"].astype(str)
     return gc[["game_id","home_team_id","away_team_id"]]
 
 
+def game_team_maps(gc: pd.DataFrame | None) -> tuple[dict[str, str], dict[str, str]] | None:
+    # game_id -> home / away team id, built once per run
+    if gc is None:
+        return None
+    return dict(zip(gc["game_id"], gc["home_team_id"])), dict(zip(gc["game_id"], gc["away_team_id"]))
+
+
+OUT_COLUMNS = [
+    "season_year", "game_id", "player_id", "team_id", "period_number", "clock", "clock_seconds",
+    "event_type", "action", "result", "points_value", "home_points", "away_points",
+    "margin_home", "margin_for_team", "state", "hx", "hy", "description", "action_area", "loc_x", "loc_y",
+]
+ISSUE_COLUMNS = ["bucket", "raw_name", "event_type", "description"]
+# per-action columns (everything else comes from the event itself)
+COORD_COLUMNS = ("hx", "hy", "action_area", "loc_x", "loc_y")
+ACTION_COLUMNS = ("player_id", "action", "result", "points_value") + COORD_COLUMNS
+
+
+def write_csv(df: pd.DataFrame, path: Path, writer: str, append: bool = False) -> None:
+    # arrow writes several times faster, but quotes strings and drops trailing ".0" on whole floats
+    # append=True adds rows under an existing header (chunked runs)
+    if writer == "arrow":
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        with open(path, "ab" if append else "wb") as f:
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f, pacsv.WriteOptions(include_header=not append))
+    else:
+        df.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
+def text_col(ev: pd.DataFrame, col: str | None, default: str = "") -> pd.Series:
+    # str() of every value, as the old row loop did (NaN -> "nan"); missing column -> default
+    if not col or col not in ev.columns:
+        return pd.Series(default, index=ev.index, dtype=object)
+    return ev[col].astype(str).fillna("nan")
+
+
+def raw_col(ev: pd.DataFrame, col: str, default=None) -> pd.Series:
+    if col not in ev.columns:
+        return pd.Series(default, index=ev.index, dtype=object)
+    return ev[col]
+
+
+def resolve_names(names: pd.Series, teams: pd.Series, lut, alias_map) -> pd.Series:
+    # same rules as resolve_player_id: unambiguous names resolve with one dict map, shared names
+    # are settled by preferred team once per distinct (name, team) pair
+    lut_single, lut_ambig = lut
+    norm = names.map(norm_name)
+    if alias_map:
+        norm = norm.map(lambda n: alias_map.get(n, n))
+    pids = norm.map(lut_single).astype(object)
+    ambig = norm.isin(lut_ambig.keys())
+    if ambig.any():
+        codes, uniq = pd.factorize(pd.MultiIndex.from_arrays([norm[ambig], teams[ambig]]))
+        picked = np.array([next((pid for pid, tid in lut_ambig[n] if t and tid == t), None) for n, t in uniq], dtype=object)
+        pids[ambig] = picked[codes]
+    return pids
+
+
+def parse_events(ev: pd.DataFrame, lut, alias_map, team_maps: tuple[dict[str, str], dict[str, str]] | None, season: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Parse events into player action rows + unresolved-name issues.
+
+    Each pattern runs once over the whole description column, the branch
+    precedence (shot > free throw > rebound > turnover > foul) is applied with
+    masks, and per-action frames are stacked back into event order.
+    """
+    ev = ev[text_col(ev, "description").str.contains(RE_ACTIONABLE).to_numpy()].reset_index(drop=True)
+
+    # columns used for team context (best effort)
+    team_att_col = "attribution_team_id" if "attribution_team_id" in ev.columns else None
+    poss_team_col = "possession_team_id" if "possession_team_id" in ev.columns else None
+
+    desc = text_col(ev, "description")
+    kind = desc.str.extract(RE_KIND).notna()
+    et = text_col(ev, "event_type").str.lower()
+    clock = text_col(ev, "clock")
+    game_id = text_col(ev, "game_id")
+
+    preferred_team = text_col(ev, team_att_col)
+    team = preferred_team if team_att_col else text_col(ev, poss_team_col)
+
+    period = raw_col(ev, "period_number", "")
+    if not pd.api.types.is_integer_dtype(period):
+        period = period.map(lambda p: int(p) if str(p).isdigit() else p)
+
+    home_pts = raw_col(ev, "home_points")
+    away_pts = raw_col(ev, "away_points")
+
+    # margin: home perspective always, team perspective when the game context knows the team
+    has_score = home_pts.notna() & away_pts.notna()
+    margin_home = home_pts.where(has_score).astype(float) - away_pts.where(has_score).astype(float)
+    margin_team = pd.Series(np.nan, index=ev.index)
+    if team_maps is not None:
+        home_map, away_map = team_maps
+        home_id = game_id.map(home_map)
+        away_id = game_id.map(away_map)
+        known = has_score & (team != "")
+        margin_team = margin_home.where(known & (team == home_id), (-margin_home).where(known & (team == away_id)))
+    state = np.select([margin_team > 0, margin_team < 0, margin_team == 0], ["winning", "trailing", "tied"], "")
+
+    # coords (missing -> NaN, written as blank cells)
+    has_xy = "loc_x" in ev.columns and "loc_y" in ev.columns
+    loc_x = raw_col(ev, "loc_x", np.nan)
+    loc_y = raw_col(ev, "loc_y", np.nan)
+    action_area = raw_col(ev, "action_area", np.nan)
+
+    base = pd.DataFrame({
+        "season_year": str(season),
+        "game_id": game_id,
+        "team_id": team,
+        "period_number": period,
+        "clock": clock,
+        "clock_seconds": clock_to_seconds(clock),
+        "event_type": et,
+        "home_points": home_pts,
+        "away_points": away_pts,
+        "margin_home": margin_home,
+        "margin_for_team": margin_team,
+        "state": state,
+        "description": desc,
+    })
+
+    # columnar builders: each action appends whole arrays per column; frames are assembled once at the end
+    rows = {c: [] for c in ("_ev", "_sub") + ACTION_COLUMNS}
+    issues = {c: [] for c in ("_ev", "_sub", "bucket", "raw_name")}
+
+    def emit(names: pd.Series, bucket: str, action, result, points_value=None, coords=None, sub: int = 0) -> pd.Index:
+        # names: raw actor name per event (NaN = no actor); resolved -> rows, unresolved -> issues
+        # returns the events that produced a row
+        names = names.dropna()
+        if names.empty:
+            return names.index
+        pid = resolve_names(names, preferred_team[names.index], lut, alias_map)
+        ok = pid.notna().to_numpy()
+
+        bad = names.index[~ok]
+        issues["_ev"].append(bad.to_numpy())
+        issues["_sub"].append(np.full(len(bad), sub))
+        issues["bucket"].append(np.full(len(bad), bucket, dtype=object))
+        issues["raw_name"].append(names[bad].to_numpy(dtype=object))
+
+        idx = names.index[ok]
+        pick = lambda v: v[idx].to_numpy(dtype=object) if isinstance(v, pd.Series) else np.full(len(idx), v, dtype=object)
+        rows["_ev"].append(idx.to_numpy())
+        rows["_sub"].append(np.full(len(idx), sub))
+        rows["player_id"].append(pid[idx].astype(str).to_numpy(dtype=object))
+        rows["action"].append(pick(action))
+        rows["result"].append(pick(result))
+        rows["points_value"].append(pick(points_value))
+        for c in COORD_COLUMNS:
+            rows[c].append(pick(coords[c] if coords else np.nan))
+        return idx
+
+    def assemble(cols: dict[str, list[np.ndarray]], columns: list[str]) -> pd.DataFrame:
+        # one stable sort by (event, sub-action) puts rows back in event order
+        data = {c: np.concatenate(v) if v else np.empty(0, dtype=object) for c, v in cols.items()}
+        order = np.lexsort((data.pop("_sub").astype(int), data["_ev"].astype(int)))
+        frame = base.take(data.pop("_ev").astype(int)[order]).reset_index(drop=True)
+        for c, v in data.items():
+            frame[c] = v[order]
+        return frame[columns]
+
+    # ---------------- shots (2/3) ----------------
+    is_shot = kind["shot"]
+    shot = desc.where(is_shot).str.extract(RE_SHOT)
+    shot_made = is_shot & (shot[1].str.lower() == "makes")
+    is_three = shot[2].str.lower().str.contains("three", regex=False).fillna(False).astype(bool)
+    hx, hy = normalize_xy_to_hoop(loc_x, loc_y) if has_xy else (np.full(len(ev), np.nan),) * 2
+    hxy = pd.DataFrame({"hx": hx, "hy": hy}, index=ev.index)
+    shot_rows = emit(shot[0].str.strip(), "shot",
+                     action=pd.Series(np.where(is_three, "three_pa", "two_pa"), index=ev.index),
+                     result=pd.Series(np.where(shot_made, "made", "missed"), index=ev.index),
+                     points_value=pd.Series(np.where(is_three, 3, 2), index=ev.index),
+                     coords={"hx": hxy["hx"], "hy": hxy["hy"], "action_area": action_area, "loc_x": loc_x, "loc_y": loc_y})
+
+    # assist actor (made shots whose shooter resolved)
+    assist = desc.where(shot_made & ev.index.isin(shot_rows)).str.extract(RE_ASSIST)[0]
+    emit(assist.str.strip(), "assist_name", action="assist", result="credited", sub=1)
+
+    # ---------------- free throws ----------------
+    has_ft_text = kind["ft"]
+    is_ft = ~is_shot & (et.str.contains("freethrow", regex=False) | et.str.contains("free_throw", regex=False) | has_ft_text)
+    ft = desc.where(is_ft).str.extract(RE_FT)
+    # looser fallback
+    ft_loose = desc.where(is_ft & ft[0].isna() & has_ft_text).str.extract(RE_FT_LOOSE)
+    ft_name = ft[0].fillna(ft_loose[0])
+    ft_made = ft[1].fillna(ft_loose[1]).str.lower() == "makes"
+    emit(ft_name.str.strip(), "ft", action="fta",
+         result=pd.Series(np.where(ft_made, "made", "missed"), index=ev.index),
+         points_value=1,
+         coords={"hx": np.nan, "hy": np.nan, "action_area": action_area, "loc_x": loc_x, "loc_y": loc_y})  # FT coords are often placeholders
+
+    rest = ~is_shot & ~is_ft
+
+    # ---------------- rebounds ----------------
+    is_reb = rest & kind["reb"]
+    reb = desc.where(is_reb).str.extract(RE_REB)
+    emit(reb[0].str.strip(), "rebound",
+         action=pd.Series(np.where(reb[1].str.lower() == "offensive", "orb", "drb"), index=ev.index),
+         result="secured")
+
+    # ---------------- turnovers ----------------
+    is_tov = rest & ~is_reb & (et.str.contains("turnover", regex=False) | kind["tov"])
+    tov_a = desc.where(is_tov).str.extract(RE_TOV_A)[0]
+    tov_b = desc.where(is_tov & tov_a.isna()).str.extract(RE_TOV_B)[0]
+    tov_name = tov_a.fillna(tov_b).str.strip()
+    emit(tov_name.where(tov_name != ""), "turnover", action="turnover", result="committed")
+
+    # ---------------- fouls (committed + drawn) ----------------
+    is_foul = rest & ~is_reb & ~is_tov & et.str.contains("foul", regex=False)
+    fouler = desc.where(is_foul).str.extract(RE_FOUL_LEAD)[0].str.strip()
+    drawer = desc.where(is_foul).str.extract(RE_DRAWS)[0].str.strip()
+    emit(fouler.where(fouler != ""), "foul_committed", action="foul_committed", result="called")
+    emit(drawer.where(drawer != ""), "foul_drawn", action="foul_drawn", result="drawn", sub=1)
+
+    out = assemble(rows, OUT_COLUMNS)
+    out["points_value"] = pd.array(out["points_value"], dtype="Int64")
+    return out, assemble(issues, ISSUE_COLUMNS)
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--events", required=True, help="pbp_events_canonical.csv")
@@ -169,270 +409,40 @@ def main():
     ap.add_argument("--game_context", default="", help="optional phase4_game_context_2025.csv to compute team-perspective margin")
     ap.add_argument("--out", default="derived/pbp_player_actions_2025.csv")
     ap.add_argument("--issues_out", default="derived/pbp_player_actions_issues_2025.csv")
+    ap.add_argument("--chunksize", type=int, default=0, help="parse the events this many rows at a time to bound memory (0 = whole file)")
+    ap.add_argument("--csv_writer", choices=["pandas", "arrow"], default="pandas", help="arrow is faster; pandas keeps the existing cell formatting")
     args = ap.parse_args()
 
-    ev = pd.read_csv(args.events, low_memory=False)
     p0 = load_phase0(Path(args.phase0))
     lut = build_name_lookup(p0)
 
     alias_map = load_aliases(Path(args.aliases)) if args.aliases else {}
 
     gc = load_game_context(Path(args.game_context)) if args.game_context else None
-    if gc is not None:
-        gc = gc.set_index("game_id")
+    team_maps = game_team_maps(gc)
 
-    # columns used for team context (best effort)
-    team_att_col = "attribution_team_id" if "attribution_team_id" in ev.columns else None
-    poss_team_col = "possession_team_id" if "possession_team_id" in ev.columns else None
-
-    out_rows = []
-    issues = []
-
-    def margin_for_team(game_id: str, team_id: str | None, home_pts: float, away_pts: float):
-        # always compute margin_home
-        margin_home = None
-        if pd.notna(home_pts) and pd.notna(away_pts):
-            margin_home = float(home_pts) - float(away_pts)
-
-        if gc is None or not team_id or margin_home is None:
-            return margin_home, None, None
-
-        try:
-            g = gc.loc[str(game_id)]
-        except Exception:
-            return margin_home, None, None
-
-        home_id = str(g["home_team_id"])
-        away_id = str(g["away_team_id"])
-
-        if str(team_id) == home_id:
-            m = margin_home
-        elif str(team_id) == away_id:
-            m = -margin_home
-        else:
-            return margin_home, None, None
-
-        if m > 0:
-            state = "winning"
-        elif m < 0:
-            state = "trailing"
-        else:
-            state = "tied"
-        return margin_home, m, state
-
-    def add_row(player_id, team_id, game_id, period, clock, et, action, result, points_value, hx, hy, home_pts, away_pts, desc, action_area, loc_x, loc_y):
-        cs = clock_to_seconds(clock)
-        margin_home, m_team, state = margin_for_team(game_id, team_id, home_pts, away_pts)
-
-        out_rows.append({
-            "season_year": str(args.season),
-            "game_id": str(game_id),
-            "player_id": str(player_id),
-            "team_id": str(team_id) if team_id is not None else "",
-            "period_number": int(period) if str(period).isdigit() else period,
-            "clock": str(clock),
-            "clock_seconds": cs,
-            "event_type": str(et),
-            "action": str(action),
-            "result": str(result) if result is not None else "",
-            "points_value": points_value if points_value is not None else "",
-            "home_points": home_pts,
-            "away_points": away_pts,
-            "margin_home": margin_home if margin_home is not None else "",
-            "margin_for_team": m_team if m_team is not None else "",
-            "state": state if state is not None else "",
-            "hx": hx if hx is not None else "",
-            "hy": hy if hy is not None else "",
-            "description": desc,
-            "action_area": action_area if action_area is not None else "",
-            "loc_x": loc_x if loc_x is not None else "",
-            "loc_y": loc_y if loc_y is not None else "",
-        })
-
-    for r in ev.itertuples(index=False):
-        game_id = str(getattr(r, "game_id", ""))
-        period = getattr(r, "period_number", "")
-        clock = str(getattr(r, "clock", "") or "")
-        et = str(getattr(r, "event_type", "") or "").lower()
-        desc = str(getattr(r, "description", "") or "")
-
-        home_pts = getattr(r, "home_points", None)
-        away_pts = getattr(r, "away_points", None)
-
-        # coords
-        loc_x = getattr(r, "loc_x", None) if "loc_x" in ev.columns else None
-        loc_y = getattr(r, "loc_y", None) if "loc_y" in ev.columns else None
-        action_area = getattr(r, "action_area", "") if "action_area" in ev.columns else ""
-
-        hx, hy = normalize_xy_to_hoop(loc_x, loc_y) if (loc_x is not None and loc_y is not None) else (None, None)
-
-        preferred_team = str(getattr(r, team_att_col)) if team_att_col else None
-        poss_team = str(getattr(r, poss_team_col)) if poss_team_col else None
-
-        # ---------------- shots (2/3) ----------------
-        m = RE_SHOT.search(desc)
-        if m:
-            shooter = m.group(1).strip()
-            verb = m.group(2).lower()
-            kind = m.group(3).lower()
-
-            pid = resolve_player_id(shooter, lut, alias_map, preferred_team)
-            if not pid:
-                issues.append({"bucket":"shot", "raw_name": shooter, "event_type": et, "description": desc})
-            else:
-                points_value = 3 if "three" in kind else 2
-                add_row(
-                    pid, preferred_team or poss_team, game_id, period, clock, et,
-                    action=("three_pa" if points_value==3 else "two_pa"),
-                    result=("made" if verb=="makes" else "missed"),
-                    points_value=points_value,
-                    hx=hx, hy=hy,
-                    home_pts=home_pts, away_pts=away_pts,
-                    desc=desc, action_area=action_area, loc_x=loc_x, loc_y=loc_y
-                )
-
-                # assist actor
-                if verb == "makes":
-                    a = RE_ASSIST.search(desc)
-                    if a:
-                        passer = a.group(1).strip()
-                        apid = resolve_player_id(passer, lut, alias_map, preferred_team)
-                        if apid:
-                            add_row(
-                                apid, preferred_team or poss_team, game_id, period, clock, et,
-                                action="assist",
-                                result="credited",
-                                points_value="",
-                                hx="", hy="",
-                                home_pts=home_pts, away_pts=away_pts,
-                                desc=desc, action_area="", loc_x="", loc_y=""
-                            )
-                        else:
-                            issues.append({"bucket":"assist_name", "raw_name": passer, "event_type": et, "description": desc})
-            continue
-
-        # ---------------- free throws ----------------
-        if ("freethrow" in et) or ("free_throw" in et) or ("free throw" in desc.lower()):
-            mft = RE_FT.search(desc)
-            if mft:
-                shooter = mft.group(1).strip()
-                verb = mft.group(2).lower()
-            else:
-                # looser fallback
-                mft2 = re.match(r"^(.+?)\s+(makes|misses)\b", desc, flags=re.IGNORECASE)
-                if not mft2 or "free throw" not in desc.lower():
-                    continue
-                shooter = mft2.group(1).strip()
-                verb = mft2.group(2).lower()
-
-            pid = resolve_player_id(shooter, lut, alias_map, preferred_team)
-            if not pid:
-                issues.append({"bucket":"ft", "raw_name": shooter, "event_type": et, "description": desc})
-            else:
-                add_row(
-                    pid, preferred_team or poss_team, game_id, period, clock, et,
-                    action="fta",
-                    result=("made" if verb=="makes" else "missed"),
-                    points_value=1,
-                    hx="", hy="",  # FT coords are often placeholders
-                    home_pts=home_pts, away_pts=away_pts,
-                    desc=desc, action_area=action_area, loc_x=loc_x, loc_y=loc_y
-                )
-            continue
-
-        # ---------------- rebounds ----------------
-        mreb = RE_REB.search(desc)
-        if mreb:
-            name = mreb.group(1).strip()
-            kind = mreb.group(2).lower()
-            pid = resolve_player_id(name, lut, alias_map, preferred_team)
-            if not pid:
-                issues.append({"bucket":"rebound", "raw_name": name, "event_type": et, "description": desc})
-            else:
-                add_row(
-                    pid, preferred_team or poss_team, game_id, period, clock, et,
-                    action=("orb" if kind=="offensive" else "drb"),
-                    result="secured",
-                    points_value="",
-                    hx="", hy="",
-                    home_pts=home_pts, away_pts=away_pts,
-                    desc=desc, action_area="", loc_x="", loc_y=""
-                )
-            continue
-
-        # ---------------- turnovers ----------------
-        if ("turnover" in et) or ("turnover" in desc.lower()):
-            name = None
-            mt = RE_TOV_A.search(desc)
-            if mt:
-                name = mt.group(1).strip()
-            else:
-                mt2 = RE_TOV_B.search(desc)
-                if mt2:
-                    name = mt2.group(1).strip()
-
-            if name:
-                pid = resolve_player_id(name, lut, alias_map, preferred_team)
-                if not pid:
-                    issues.append({"bucket":"turnover", "raw_name": name, "event_type": et, "description": desc})
-                else:
-                    add_row(
-                        pid, preferred_team or poss_team, game_id, period, clock, et,
-                        action="turnover",
-                        result="committed",
-                        points_value="",
-                        hx="", hy="",
-                        home_pts=home_pts, away_pts=away_pts,
-                        desc=desc, action_area="", loc_x="", loc_y=""
-                    )
-            continue
-
-        # ---------------- fouls (committed + drawn) ----------------
-        if "foul" in et:
-            mlead = RE_FOUL_LEAD.search(desc)
-            fouler = mlead.group(1).strip() if mlead else None
-
-            drawer = None
-            chunks = RE_PARENS.findall(desc)
-            for ch in reversed(chunks):
-                if "draw" in ch.lower() and "foul" in ch.lower():
-                    md = RE_DRAWS.search(ch.strip())
-                    if md:
-                        drawer = md.group(1).strip()
-                        break
-
-            if fouler:
-                pid = resolve_player_id(fouler, lut, alias_map, preferred_team)
-                if pid:
-                    add_row(pid, preferred_team or poss_team, game_id, period, clock, et,
-                            action="foul_committed", result="called", points_value="",
-                            hx="", hy="", home_pts=home_pts, away_pts=away_pts,
-                            desc=desc, action_area="", loc_x="", loc_y="")
-                else:
-                    issues.append({"bucket":"foul_committed", "raw_name": fouler, "event_type": et, "description": desc})
-
-            if drawer:
-                pid = resolve_player_id(drawer, lut, alias_map, preferred_team)
-                if pid:
-                    add_row(pid, preferred_team or poss_team, game_id, period, clock, et,
-                            action="foul_drawn", result="drawn", points_value="",
-                            hx="", hy="", home_pts=home_pts, away_pts=away_pts,
-                            desc=desc, action_area="", loc_x="", loc_y="")
-                else:
-                    issues.append({"bucket":"foul_drawn", "raw_name": drawer, "event_type": et, "description": desc})
-
-            continue
+    # events parse row-independently, so chunks can be parsed and appended one at a time
+    # (chunked reads infer column types per chunk)
+    if args.chunksize > 0:
+        chunks = pd.read_csv(args.events, low_memory=False, chunksize=args.chunksize)
+    else:
+        chunks = [pd.read_csv(args.events, engine="pyarrow")]
 
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(out_rows).to_csv(out, index=False)
-    print("wrote:", out, "rows:", len(out_rows))
-
     issues_out = Path(args.issues_out)
     issues_out.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(issues).to_csv(issues_out, index=False)
-    print("issues:", issues_out, "rows:", len(issues))
 
+    n_rows = n_issues = 0
+    for i, ev in enumerate(chunks):
+        out_df, issues = parse_events(ev, lut, alias_map, team_maps, args.season)
+        write_csv(out_df, out, args.csv_writer, append=i > 0)
+        write_csv(issues, issues_out, args.csv_writer, append=i > 0)
+        n_rows += len(out_df)
+        n_issues += len(issues)
+
+    print("wrote:", out, "rows:", n_rows)
+    print("issues:", issues_out, "rows:", n_issues)
 
 if __name__ == "__main__":
     main()
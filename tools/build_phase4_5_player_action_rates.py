@@ -25,26 +25,29 @@ def load_minutes(phase1_csv: str | None) -> pd.DataFrame | None:
     # expected cols: playerId, g, mpg
     if not {"playerId", "g", "mpg"} <= set(df.columns):
         raise RuntimeError(f"phase1 workload missing expected cols. got={df.columns.tolist()}")
-    df = df.copy()
     df["playerId"] = df["playerId"].astype(str)
     df["g"] = pd.to_numeric(df["g"], errors="coerce").fillna(0)
     df["mpg"] = pd.to_numeric(df["mpg"], errors="coerce").fillna(0)
     df["minutes_est"] = df["g"] * df["mpg"]
     return df[["playerId", "minutes_est", "g", "mpg"]].rename(columns={"playerId": "player_id"})
 
-def per36(x: float, minutes: float) -> float:
-    if minutes and minutes > 0:
-        return 36.0 * (x / minutes)
-    return np.nan
+def write_csv(df: pd.DataFrame, path: str, writer: str) -> None:
+    if writer == "arrow":
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), str(path))
+    else:
+        df.to_csv(path, index=False)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pbp-actions", required=True, help="derived/pbp_player_actions_2025.csv")
     ap.add_argument("--phase1-workload", default="", help="raw_data/phase1_players_workload_2025.csv (optional but recommended)")
     ap.add_argument("--out", default="derived/phase4_5_player_action_rates_2025.csv")
+    ap.add_argument("--csv-writer", choices=["pandas", "arrow"], default="pandas", help="CSV writer for the rates table (default: pandas)")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.pbp_actions, low_memory=False)
+    df = pd.read_csv(args.pbp_actions, engine="pyarrow")
     df["player_id"] = df["player_id"].astype(str)
     df["season_year"] = df["season_year"].astype(str)
 
@@ -52,25 +55,26 @@ def main():
     df["action"] = df["action"].astype(str).str.lower()
     df["result"] = df["result"].astype(str).str.lower()
 
-    # basic makes
-    df["is_made"] = (df["result"] == "made").astype(int)
+    # heavily repeated labels/keys -> categoricals so grouping and pivots work on integer codes
+    for c in ["season_year", "player_id", "action", "result"]:
+        df[c] = df[c].astype("category")
 
-    # counts by action (player-season)
+    # counts by action x result (player-season); totals and makes are both read off this one table
     counts = df.pivot_table(
         index=["season_year", "player_id"],
-        columns="action",
+        columns=["action", "result"],
         values="game_id",
         aggfunc="count",
-        fill_value=0
-    ).reset_index()
+        fill_value=0,
+        observed=True
+    )
+    actions = set(counts.columns.get_level_values(0))
 
     # derived core stats
-    def col(c): return counts[c] if c in counts.columns else 0
+    def col(c): return counts[c].sum(axis=1) if c in actions else 0
+    def made(c): return counts[(c, "made")] if (c, "made") in counts.columns else 0
 
     out = pd.DataFrame({
-        "season_year": counts["season_year"],
-        "player_id": counts["player_id"],
-
         "fga": col("two_pa") + col("three_pa"),
         "three_pa": col("three_pa"),
         "fta": col("fta"),
@@ -83,25 +87,12 @@ def main():
 
         "orb": col("orb"),
         "drb": col("drb"),
-    })
-
-    # makes
-    shots = df[df["action"].isin(ACTIONS_SHOT)].copy()
-    makes = shots.groupby(["season_year", "player_id"])["is_made"].sum().reset_index().rename(columns={"is_made":"fgm"})
-    out = out.merge(makes, on=["season_year","player_id"], how="left")
-    out["fgm"] = out["fgm"].fillna(0).astype(int)
-
-    # 3pt makes
-    threes = df[df["action"] == "three_pa"].copy()
-    threes_m = threes.groupby(["season_year","player_id"])["is_made"].sum().reset_index().rename(columns={"is_made":"three_pm"})
-    out = out.merge(threes_m, on=["season_year","player_id"], how="left")
-    out["three_pm"] = out["three_pm"].fillna(0).astype(int)
-
-    # ft makes
-    fts = df[df["action"] == "fta"].copy()
-    ftm = fts.groupby(["season_year","player_id"])["is_made"].sum().reset_index().rename(columns={"is_made":"ftm"})
-    out = out.merge(ftm, on=["season_year","player_id"], how="left")
-    out["ftm"] = out["ftm"].fillna(0).astype(int)
+
+        # makes
+        "fgm": sum(made(c) for c in ACTIONS_SHOT),
+        "three_pm": made("three_pa"),
+        "ftm": made("fta"),
+    }, index=counts.index).reset_index()
 
     # rates
     out["fg_pct"] = np.where(out["fga"] > 0, out["fgm"] / out["fga"], np.nan)
@@ -118,13 +109,16 @@ def main():
     if mins is not None:
         out = out.merge(mins, on="player_id", how="left")
         out["minutes_est"] = pd.to_numeric(out["minutes_est"], errors="coerce")
+        # players without a positive minutes estimate get NaN per36
+        m = out["minutes_est"].to_numpy(dtype="float64")
+        denom = np.where(m > 0, m, np.nan)
         for k in ["fga","three_pa","fta","ast","tov","pf_committed","pf_drawn","orb","drb"]:
-            out[f"{k}_per36"] = out.apply(lambda r: per36(r[k], r["minutes_est"]), axis=1)
+            out[f"{k}_per36"] = 36.0 * (out[k].to_numpy(dtype="float64") / denom)
     else:
         out["minutes_est"] = np.nan
 
     Path(args.out).parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(args.out, index=False)
+    write_csv(out, args.out, args.csv_writer)
     print("wrote", args.out, "rows", len(out))
 
 
@@ -7,42 +7,47 @@ import numpy as np
 import pandas as pd
 
 
-def is_clutch(period_number, clock_seconds) -> bool:
-    try:
-        p = int(period_number)
-    except Exception:
-        return False
-    try:
-        cs = int(clock_seconds)
-    except Exception:
-        return False
-    return (p == 4 and cs <= 120) or (p >= 5)
-
-def margin_bucket(m: float) -> str:
-    if m is None or pd.isna(m):
-        return "unknown"
-    m = float(m)
-    if m <= -10: return "trail_10plus"
-    if m <= -4:  return "trail_4_9"
-    if m < 0:    return "trail_1_3"
-    if m == 0:   return "tied"
-    if m < 4:    return "lead_1_3"
-    if m < 10:   return "lead_4_9"
-    return "lead_10plus"
+def is_clutch(period_number: pd.Series, clock_seconds: pd.Series) -> np.ndarray:
+    # last 2:00 of Q4 or any OT; rows missing either value are never clutch
+    p = np.trunc(pd.to_numeric(period_number, errors="coerce").to_numpy(dtype="float64"))
+    cs = np.trunc(pd.to_numeric(clock_seconds, errors="coerce").to_numpy(dtype="float64"))
+    known = np.isfinite(p) & np.isfinite(cs)
+    return known & (((p == 4) & (cs <= 120)) | (p >= 5))
+
+def margin_bucket(m: pd.Series) -> np.ndarray:
+    m = pd.to_numeric(m, errors="coerce").to_numpy(dtype="float64")
+    return np.select(
+        [np.isnan(m), m <= -10, m <= -4, m < 0, m == 0, m < 4, m < 10],
+        ["unknown", "trail_10plus", "trail_4_9", "trail_1_3", "tied", "lead_1_3", "lead_4_9"],
+        "lead_10plus",
+    )
+
+def write_csv(df: pd.DataFrame, path: str, writer: str) -> None:
+    if writer == "arrow":
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), str(path))
+    else:
+        df.to_csv(path, index=False)
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pbp-actions", required=True, help="derived/pbp_player_actions_2025.csv")
     ap.add_argument("--phase1-workload", default="", help="raw_data/phase1_players_workload_2025.csv (optional for per36)")
     ap.add_argument("--out", default="derived/phase4_5_player_context_splits_2025.csv")
+    ap.add_argument("--csv-writer", choices=["pandas", "arrow"], default="pandas", help="CSV writer for the splits table (default: pandas)")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.pbp_actions, low_memory=False)
+    df = pd.read_csv(args.pbp_actions, engine="pyarrow")
     df["player_id"] = df["player_id"].astype(str)
     df["season_year"] = df["season_year"].astype(str)
     df["action"] = df["action"].astype(str).str.lower()
     df["result"] = df["result"].astype(str).str.lower()
 
+    # heavily repeated labels/keys -> categoricals so grouping and pivots work on integer codes
+    for c in ["season_year", "player_id", "action", "result"]:
+        df[c] = df[c].astype("category")
+
     df["clock_seconds"] = pd.to_numeric(df["clock_seconds"], errors="coerce")
     df["period_number"] = pd.to_numeric(df["period_number"], errors="coerce")
 
@@ -52,8 +57,8 @@ def main():
     m_home = pd.to_numeric(df.get("margin_home"), errors="coerce")
     df["margin_used"] = np.where(~m_team.isna(), m_team, m_home)
 
-    df["clutch"] = df.apply(lambda r: is_clutch(r["period_number"], r["clock_seconds"]), axis=1)
-    df["bucket"] = df["margin_used"].apply(margin_bucket)
+    df["clutch"] = is_clutch(df["period_number"], df["clock_seconds"])
+    df["bucket"] = margin_bucket(df["margin_used"])
 
     # define what we care about
     df["is_fga"] = df["action"].isin(["two_pa","three_pa"]).astype(int)
@@ -63,61 +68,32 @@ def main():
     df["is_tov"] = (df["action"] == "turnover").astype(int)
     df["is_made"] = ((df["result"] == "made") & df["action"].isin(["two_pa","three_pa"])).astype(int)
 
+    # one pass over the events at (season, player, clutch, bucket, quarter) grain; the three splits
+    # below re-sum this small table instead of each grouping the events again.
+    # quarter 0 = overtime / unknown period, kept out of the quarter split
+    in_reg = df["period_number"].between(1,4, inclusive="both")
+    df["q"] = df["period_number"].where(in_reg, 0).astype(int)
+    stats = {"is_fga":"fga", "is_made":"fgm", "is_3pa":"three_pa", "is_fta":"fta", "is_ast":"ast", "is_tov":"tov"}
+    fine = df.groupby(["season_year","player_id","clutch","bucket","q"], observed=True)[list(stats)].sum().rename(columns=stats)
+
+    def split(frame: pd.DataFrame, by: str, values: list[str]) -> pd.DataFrame:
+        # the re-summed groups are unique, so a plain unstack does the pivot; columns sorted (stat, label) as pivot_table had them
+        agg = frame.groupby(level=["season_year","player_id",by], observed=True)[values].sum()
+        return agg.unstack(by, fill_value=0).sort_index(axis=1)
+
     # clutch split
-    clutch_agg = df.groupby(["season_year","player_id","clutch"], as_index=False).agg(
-        fga=("is_fga","sum"),
-        fgm=("is_made","sum"),
-        three_pa=("is_3pa","sum"),
-        fta=("is_fta","sum"),
-        ast=("is_ast","sum"),
-        tov=("is_tov","sum"),
-    )
-    clutch_agg["clutch"] = clutch_agg["clutch"].map({True:"clutch", False:"non_clutch"})
-
-    clutch_wide = clutch_agg.pivot_table(
-        index=["season_year","player_id"],
-        columns="clutch",
-        values=["fga","fgm","three_pa","fta","ast","tov"],
-        aggfunc="sum",
-        fill_value=0
-    )
-    clutch_wide.columns = [f"{a}_{b}" for a,b in clutch_wide.columns]
+    # split on the bool and label at flatten; True first so "clutch" still sorts ahead of "non_clutch"
+    clutch_wide = split(fine, "clutch", ["fga","fgm","three_pa","fta","ast","tov"]).sort_index(axis=1, ascending=[True, False])
+    clutch_wide.columns = [f"{a}_{'clutch' if b else 'non_clutch'}" for a,b in clutch_wide.columns]
     clutch_wide = clutch_wide.reset_index()
 
     # margin bucket split (counts)
-    bucket_agg = df.groupby(["season_year","player_id","bucket"], as_index=False).agg(
-        fga=("is_fga","sum"),
-        three_pa=("is_3pa","sum"),
-        fta=("is_fta","sum"),
-        tov=("is_tov","sum"),
-        ast=("is_ast","sum"),
-    )
-    bucket_wide = bucket_agg.pivot_table(
-        index=["season_year","player_id"],
-        columns="bucket",
-        values=["fga","three_pa","fta","tov","ast"],
-        aggfunc="sum",
-        fill_value=0
-    )
+    bucket_wide = split(fine, "bucket", ["fga","three_pa","fta","tov","ast"])
     bucket_wide.columns = [f"{a}_{b}" for a,b in bucket_wide.columns]
     bucket_wide = bucket_wide.reset_index()
 
     # quarter split (fga + 3pa + tov)
-    q = df[df["period_number"].between(1,4, inclusive="both")].copy()
-    q["q"] = q["period_number"].astype(int)
-    q_agg = q.groupby(["season_year","player_id","q"], as_index=False).agg(
-        fga=("is_fga","sum"),
-        three_pa=("is_3pa","sum"),
-        tov=("is_tov","sum"),
-        ast=("is_ast","sum"),
-    )
-    q_wide = q_agg.pivot_table(
-        index=["season_year","player_id"],
-        columns="q",
-        values=["fga","three_pa","tov","ast"],
-        aggfunc="sum",
-        fill_value=0
-    )
+    q_wide = split(fine[fine.index.get_level_values("q") > 0], "q", ["fga","three_pa","tov","ast"])
     q_wide.columns = [f"{a}_q{b}" for a,b in q_wide.columns]
     q_wide = q_wide.reset_index()
 
@@ -126,7 +102,7 @@ def main():
     # add per-36 if phase1 available
     if args.phase1_workload:
         p1 = pd.read_csv(args.phase1_workload, low_memory=False)
-        p1 = p1.rename(columns={"playerId":"player_id"}).copy()
+        p1 = p1.rename(columns={"playerId":"player_id"})
         p1["player_id"] = p1["player_id"].astype(str)
         p1["g"] = pd.to_numeric(p1["g"], errors="coerce").fillna(0)
         p1["mpg"] = pd.to_numeric(p1["mpg"], errors="coerce").fillna(0)
@@ -137,7 +113,7 @@ def main():
             out[f"{c}_per36"] = np.where(out["minutes_est"] > 0, 36.0 * (out[c] / out["minutes_est"]), np.nan)
 
     Path(args.out).parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(args.out, index=False)
+    write_csv(out, args.out, args.csv_writer)
     print("wrote", args.out, "rows", len(out))
 
 
@@ -5,39 +5,48 @@ import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
-import math
 
 
-def zone_from_xy(hx: float, hy: float) -> str:
+ZONES = ["rim", "paint", "mid", "corner3", "ab3"]
+
+
+def zone_from_xy(hx: np.ndarray, hy: np.ndarray, dist: np.ndarray | None = None) -> np.ndarray:
     """
     hx, hy: normalized half-court where hoop is (0,0)
     dist thresholds tuned to your Sportradar unit scale; adjust later if needed.
+    Classifies whole arrays; pass dist if it is already computed.
     """
-    dist = math.sqrt(hx*hx + hy*hy)
+    if dist is None:
+        dist = np.hypot(hx, hy)
 
     # 3pt boundary (roughly)
     is_three = dist >= 240
 
-    if dist <= 60:
-        return "rim"
-    if dist <= 140:
-        return "paint"
-    if not is_three:
-        return "mid"
+    # first match wins, same order as the thresholds read
+    return np.select(
+        [dist <= 60, dist <= 140, ~is_three, np.abs(hx) >= 250],
+        ZONES[:4],
+        "ab3",
+    )
+
 
-    # 3 zones
-    if abs(hx) >= 250:
-        return "corner3"
-    return "ab3"
+def write_table(df: pd.DataFrame, path: Path, emit: str) -> Path:
+    if emit == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="snappy")
+    else:
+        df.to_csv(path, index=False)
+    return path
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--pbp-actions", required=True, help="derived/pbp_player_actions_2025.csv")
     ap.add_argument("--out", default="derived/phase4_5_player_spatial_profile_2025.csv")
+    ap.add_argument("--emit", choices=["csv", "parquet"], default="csv", help="Write the profile as csv or parquet")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.pbp_actions, low_memory=False)
+    df = pd.read_csv(args.pbp_actions, engine="pyarrow")
     df["player_id"] = df["player_id"].astype(str)
     df["season_year"] = df["season_year"].astype(str)
     df["action"] = df["action"].astype(str).str.lower()
@@ -49,12 +58,19 @@ def main():
     shots = shots.dropna(subset=["hx","hy"])
 
     shots["is_made"] = (shots["result"] == "made").astype(int)
-    shots["shot_side"] = np.where(shots["hx"] < 0, "left", "right")
-    shots["zone"] = shots.apply(lambda r: zone_from_xy(float(r["hx"]), float(r["hy"])), axis=1)
-    shots["dist"] = np.sqrt(shots["hx"]**2 + shots["hy"]**2)
+    shots["shot_side"] = pd.Categorical(np.where(shots["hx"] < 0, "left", "right"), categories=["left", "right"])
+    hx = shots["hx"].to_numpy(dtype="float64")
+    hy = shots["hy"].to_numpy(dtype="float64")
+    dist = np.hypot(hx, hy)
+    # fixed label sets as categoricals (categories in sorted order, so unstacked columns keep their layout)
+    shots["zone"] = pd.Categorical(zone_from_xy(hx, hy, dist), categories=sorted(ZONES))
+    shots["dist"] = dist
+
+    shots["season_year"] = shots["season_year"].astype("category")
+    shots["player_id"] = shots["player_id"].astype("category")
 
     # per-player aggregates
-    g = shots.groupby(["season_year","player_id"], as_index=False).agg(
+    g = shots.groupby(["season_year","player_id"], as_index=False, observed=True).agg(
         fga=("zone","size"),
         fgm=("is_made","sum"),
         avg_dist=("dist","mean"),
@@ -63,17 +79,17 @@ def main():
         avg_hy=("hy","mean"),
     )
 
-    # zone attempts + makes
-    zone_a = shots.pivot_table(index=["season_year","player_id"], columns="zone", values="game_id", aggfunc="count", fill_value=0)
-    zone_m = shots.pivot_table(index=["season_year","player_id"], columns="zone", values="is_made", aggfunc="sum", fill_value=0)
-
-    zone_a = zone_a.add_prefix("att_").reset_index()
-    zone_m = zone_m.add_prefix("made_").reset_index()
+    # zone attempts + makes (one grouping, unstacked to att_<zone> / made_<zone>)
+    zones = shots.groupby(["season_year","player_id","zone"], sort=False, observed=True).agg(
+        att=("is_made","size"),
+        made=("is_made","sum"),
+    ).unstack("zone", fill_value=0).sort_index(axis=1)
+    zones.columns = [f"{a}_{z}" for a, z in zones.columns]
 
-    out = g.merge(zone_a, on=["season_year","player_id"], how="left").merge(zone_m, on=["season_year","player_id"], how="left")
+    out = g.merge(zones.reset_index(), on=["season_year","player_id"], how="left")
 
     # fg% by zone + share by zone
-    for z in ["rim","paint","mid","corner3","ab3"]:
+    for z in ZONES:
         att = f"att_{z}"
         made = f"made_{z}"
         if att not in out.columns: out[att] = 0
@@ -82,14 +98,14 @@ def main():
         out[f"share_{z}"] = np.where(out["fga"] > 0, out[att] / out["fga"], np.nan)
 
     # left/right bias (attempt share)
-    side = shots.pivot_table(index=["season_year","player_id"], columns="shot_side", values="game_id", aggfunc="count", fill_value=0).reset_index()
+    side = shots.groupby(["season_year","player_id","shot_side"], sort=False, observed=True).size().unstack("shot_side", fill_value=0).sort_index(axis=1).reset_index()
     side.rename(columns={"left":"att_left","right":"att_right"}, inplace=True)
     out = out.merge(side, on=["season_year","player_id"], how="left")
     out["left_share"] = np.where(out["fga"] > 0, out["att_left"].fillna(0) / out["fga"], np.nan)
 
     Path(args.out).parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(args.out, index=False)
-    print("wrote", args.out, "rows", len(out))
+    out_path = write_table(out, Path(args.out), args.emit)
+    print("wrote", out_path, "rows", len(out))
 
 
 if __name__ == "__main__":
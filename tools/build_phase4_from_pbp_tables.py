@@ -3,49 +3,64 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+import re
+import numpy as np
 import pandas as pd
 
 
-def clock_to_sec(clock_str):
-    if pd.isna(clock_str):
-        return None
-    try:
-        m, s = str(clock_str).split(":")
-        return int(m) * 60 + int(s)
-    except Exception:
-        return None
+RE_CLOCK = re.compile(r"^\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*$")
 
 
-def period_len_sec(period_number: int) -> int:
-    return 600 if period_number in (1, 2, 3, 4) else 300
+def clock_to_sec(clock: pd.Series) -> pd.Series:
+    # "mm:ss" -> seconds, whole column at once; unparseable -> NaN
+    parts = clock.astype(str).str.extract(RE_CLOCK)
+    return pd.to_numeric(parts[0]) * 60 + pd.to_numeric(parts[1])
 
 
-def game_time_elapsed_sec(period_number: int, clock_str: str):
-    rem = clock_to_sec(clock_str)
-    if rem is None:
-        return None
+def period_len_sec(period_number: np.ndarray) -> np.ndarray:
+    return np.where(np.isin(period_number, (1, 2, 3, 4)), 600, 300)
+
+
+def game_time_elapsed_sec(period_number: np.ndarray, clock: pd.Series) -> np.ndarray:
+    rem = clock_to_sec(clock).to_numpy(dtype="float64")
     plen = period_len_sec(period_number)
     elapsed_in_period = plen - rem
-    base = sum(period_len_sec(p) for p in range(1, period_number))
+    # 4 x 600s quarters, then 300s overtimes
+    base = 600 * np.clip(period_number - 1, 0, 4) + 300 * np.clip(period_number - 5, 0, None)
     return base + elapsed_in_period
 
 
-def is_clutch(period_number: int, clock_str: str, home_pts, away_pts) -> int:
-    if period_number != 4:
-        return 0
-    rem = clock_to_sec(clock_str)
-    if rem is None:
-        return 0
+def is_clutch(period_number: np.ndarray, clock: pd.Series, home_pts: pd.Series | None, away_pts: pd.Series | None) -> np.ndarray:
+    # Q4, <= 5:00 left, margin <= 5; unknown clock/score -> 0
     if home_pts is None or away_pts is None:
-        return 0
-    margin = abs(int(home_pts) - int(away_pts))
-    return 1 if (rem <= 300 and margin <= 5) else 0
-
-
-def normalize_lineup(ids):
-    ids = [str(x) for x in ids if pd.notna(x)]
-    ids = sorted(ids)
-    return tuple(ids) if len(ids) == 5 else tuple(ids)
+        return np.zeros(len(period_number), dtype=np.int8)
+    rem = clock_to_sec(clock).to_numpy(dtype="float64")
+    margin = np.abs(np.trunc(pd.to_numeric(home_pts, errors="coerce").to_numpy(dtype="float64"))
+                    - np.trunc(pd.to_numeric(away_pts, errors="coerce").to_numpy(dtype="float64")))
+    return ((period_number == 4) & (rem <= 300) & (margin <= 5)).astype(np.int8)
+
+
+# flag column -> substring of the lowercased stat_type
+STAT_FLAGS = {
+    "is_fga": "fieldgoal",
+    "is_fta": "freethrow",
+    "is_tov": "turnover",
+    "is_ast": "assist",
+    "is_reb": "rebound",
+    "is_pf": "foul",
+    "is_stl": "steal",
+    "is_blk": "block",
+}
+
+
+def write_table(df: pd.DataFrame, path: Path, emit: str) -> Path:
+    # parquet (needs pyarrow) swaps the suffix; csv keeps the path as given
+    if emit == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="snappy")
+    else:
+        df.to_csv(path, index=False)
+    return path
 
 
 def main():
@@ -53,69 +68,106 @@ def main():
     ap.add_argument("--pbp-dir", required=True, help="Folder containing pbp_*.csv tables")
     ap.add_argument("--out-dir", required=True, help="Output folder for phase4 csvs")
     ap.add_argument("--year", default="2025")
+    ap.add_argument("--emit", choices=["csv", "parquet"], default="csv", help="Output format (parquet replaces the output suffix)")
     args = ap.parse_args()
 
     pbp_dir = Path(args.pbp_dir)
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    games = pd.read_csv(pbp_dir / "pbp_games.csv")
-    events = pd.read_csv(pbp_dir / "pbp_events.csv")
-    stats = pd.read_csv(pbp_dir / "pbp_event_stats.csv")
-    lineups = pd.read_csv(pbp_dir / "pbp_lineups.csv")
-    quals = pd.read_csv(pbp_dir / "pbp_qualifiers.csv")
-
-    # groupers for per-game streaming
-    events_g = events.groupby("game_id", sort=False)
-    stats_g = stats.groupby("game_id", sort=False) if not stats.empty else {}
-    lineups_g = lineups.groupby("game_id", sort=False) if not lineups.empty else {}
-    quals_g = quals.groupby("game_id", sort=False) if not quals.empty else {}
-
-    player_rows = []
-    stint_rows = []
+    # multithreaded arrow parser; no dtype map (arrow can't apply one to int columns with blanks),
+    # ids are cast to str just below
+    games = pd.read_csv(pbp_dir / "pbp_games.csv", engine="pyarrow")
+    events = pd.read_csv(pbp_dir / "pbp_events.csv", engine="pyarrow")
+    stats = pd.read_csv(pbp_dir / "pbp_event_stats.csv", engine="pyarrow")
+    lineups = pd.read_csv(pbp_dir / "pbp_lineups.csv", engine="pyarrow")
+    quals = pd.read_csv(pbp_dir / "pbp_qualifiers.csv", engine="pyarrow")
+
+    # id columns -> str once, before the per-game split; blank player ids stay NaN so the
+    # per-game dropna still removes them
+    def str_ids(s: pd.Series) -> pd.Series:
+        return s.astype(str).where(s.notna())
+
+    events["event_id"] = events["event_id"].astype(str)
+
+    # play order, once for the whole table: the per-game groups below keep these rows in order
+    events["period_number"] = pd.to_numeric(events["period_number"], errors="coerce").fillna(0).astype(int)
+    events = events.sort_values(["game_id", "period_number", "event_number", "sequence"], kind="mergesort")
+    if not stats.empty:
+        stats["event_id"] = stats["event_id"].astype(str)
+        stats["player_id"] = str_ids(stats["player_id"])
+        stats["team_id"] = stats["team_id"].astype(str)
+
+        # stat flags for the whole table: classify each distinct stat_type once (a dozen values),
+        # then broadcast by code; rows with no stat_type (code -1) are dropped per game anyway.
+        # 0/1 flags are int8 throughout (the groupby sums still come out int64)
+        codes, stat_types = pd.factorize(stats["stat_type"].astype(str))
+        stat_types = pd.Index(stat_types).str.lower()
+        for flag, key in STAT_FLAGS.items():
+            stats[flag] = np.asarray(stat_types.str.contains(key), dtype=np.int8)[codes]
+
+        if "three_point_shot" in stats.columns:
+            stats["is_3pa"] = (stats["three_point_shot"].astype(str).str.lower() == "true").astype(np.int8)
+        else:
+            stats["is_3pa"] = np.int8(0)
+    if not lineups.empty:
+        lineups["event_id"] = str_ids(lineups["event_id"])
+        lineups["player_id"] = str_ids(lineups["player_id"])
+    if "event_id" in quals.columns:
+        quals["event_id"] = quals["event_id"].astype(str)
+
+    # split each table by game once; the loop below is then plain dict lookups
+    def by_game(df: pd.DataFrame) -> dict:
+        return dict(list(df.groupby("game_id", sort=False))) if not df.empty else {}
+
+    events_g = by_game(events)
+    stats_g = by_game(stats)
+    lineups_g = by_game(lineups)
+    quals_g = by_game(quals)
+
+    player_frames = []
+    stint_frames = []
     game_rows = []
     team_style_rows = []
 
-    for idx, g in games.iterrows():
+    for idx, g in enumerate(games.to_dict("records")):
         game_id = g["game_id"]
-        if game_id not in events_g.groups:
+        if game_id not in events_g:
             continue
 
-        ev = events_g.get_group(game_id).copy()
-        st = stats_g.get_group(game_id).copy() if hasattr(stats_g, "groups") and game_id in stats_g.groups else pd.DataFrame()
-        lu = lineups_g.get_group(game_id).copy() if hasattr(lineups_g, "groups") and game_id in lineups_g.groups else pd.DataFrame()
-        ql = quals_g.get_group(game_id).copy() if hasattr(quals_g, "groups") and game_id in quals_g.groups else pd.DataFrame()
+        # groups are fresh frames, so no copies needed
+        ev = events_g[game_id]
+        st = stats_g.get(game_id, pd.DataFrame())
+        lu = lineups_g.get(game_id, pd.DataFrame())
+        ql = quals_g.get(game_id, pd.DataFrame())
 
         home_team_id = str(g.get("home_team_id")) if pd.notna(g.get("home_team_id")) else None
         away_team_id = str(g.get("away_team_id")) if pd.notna(g.get("away_team_id")) else None
 
-        # time axis + clutch flag
-        ev["period_number"] = pd.to_numeric(ev["period_number"], errors="coerce").fillna(0).astype(int)
-        ev["t_elapsed"] = ev.apply(lambda r: game_time_elapsed_sec(int(r["period_number"]), r["clock"]), axis=1)
-        ev["is_clutch"] = ev.apply(lambda r: is_clutch(int(r["period_number"]), r["clock"], r.get("home_points"), r.get("away_points")), axis=1)
-
-        ev = ev.sort_values(["period_number", "event_number", "sequence"], kind="mergesort")
+        # time axis + clutch flag (rows are already in play order)
+        period = ev["period_number"].to_numpy()
+        ev["t_elapsed"] = game_time_elapsed_sec(period, ev["clock"])
+        ev["is_clutch"] = is_clutch(period, ev["clock"], ev.get("home_points"), ev.get("away_points"))
 
         # transition from qualifiers (basic)
         trans_ids = set()
         if not ql.empty and "qualifier" in ql.columns:
             trans_ids = set(
-                ql.loc[ql["qualifier"].astype(str).str.contains("fastbreak", case=False, na=False), "event_id"].astype(str).tolist()
+                ql.loc[ql["qualifier"].astype(str).str.contains("fastbreak", case=False, na=False), "event_id"].tolist()
             )
-        ev["event_id"] = ev["event_id"].astype(str)
-        ev["is_transition"] = ev["event_id"].isin(trans_ids).astype(int)
+        ev["is_transition"] = ev["event_id"].isin(trans_ids).astype(np.int8)
 
         # =========================
         # 1) lineup stints per team
         # =========================
+        game_stints = []
         if not lu.empty:
-            lu2 = lu.dropna(subset=["event_id", "player_id"]).copy()
-            lu2["event_id"] = lu2["event_id"].astype(str)
-            lu2["player_id"] = lu2["player_id"].astype(str)
+            # sorted ids per (event, side): sort once, then each group collapses to a tuple
+            lu2 = lu.dropna(subset=["event_id", "player_id"]).sort_values(["event_id", "side", "player_id"])
 
             lineup_by_event_side = (
-                lu2.groupby(["event_id", "side"])["player_id"]
-                .apply(lambda s: normalize_lineup(list(s)))
+                lu2.groupby(["event_id", "side"], sort=False)["player_id"]
+                .agg(tuple)
                 .reset_index()
             )
 
@@ -127,55 +179,56 @@ def main():
             ev["away_lineup"] = ev["away_lineup"].ffill()
 
             def emit_stints(side: str, team_id: str | None, lineup_col: str):
-                nonlocal stint_rows
                 if team_id is None:
                     return
-                sub = ev.dropna(subset=[lineup_col, "t_elapsed"]).copy()
+                sub = ev.dropna(subset=[lineup_col, "t_elapsed"])
                 if sub.empty:
                     return
 
-                sub["_change"] = sub[lineup_col].ne(sub[lineup_col].shift(1))
-                sub["_stint"] = sub["_change"].cumsum()
-
-                for stint_id, sg in sub.groupby("_stint"):
-                    start_t = float(sg["t_elapsed"].min())
-                    end_t = float(sg["t_elapsed"].max())
-                    duration_s = max(0.0, end_t - start_t)
-
-                    start_home = sg.iloc[0].get("home_points")
-                    start_away = sg.iloc[0].get("away_points")
-                    end_home = sg.iloc[-1].get("home_points")
-                    end_away = sg.iloc[-1].get("away_points")
-
-                    pf = pa = None
-                    if pd.notna(start_home) and pd.notna(start_away) and pd.notna(end_home) and pd.notna(end_away):
-                        if side == "home":
-                            pf = int(end_home - start_home)
-                            pa = int(end_away - start_away)
-                        else:
-                            pf = int(end_away - start_away)
-                            pa = int(end_home - start_home)
-
-                    lineup = sg.iloc[0][lineup_col]
-                    lineup_list = list(lineup) if isinstance(lineup, tuple) else []
-
-                    stint_rows.append({
-                        "season_year": args.year,
-                        "game_id": game_id,
-                        "team_id": team_id,
-                        "side": side,
-                        "stint_id": int(stint_id),
-                        "start_t": start_t,
-                        "end_t": end_t,
-                        "duration_s": duration_s,
-                        "points_for": pf,
-                        "points_against": pa,
-                        "p1": lineup_list[0] if len(lineup_list) > 0 else None,
-                        "p2": lineup_list[1] if len(lineup_list) > 1 else None,
-                        "p3": lineup_list[2] if len(lineup_list) > 2 else None,
-                        "p4": lineup_list[3] if len(lineup_list) > 3 else None,
-                        "p5": lineup_list[4] if len(lineup_list) > 4 else None,
-                    })
+                # a stint is a run of rows with an unchanged lineup: rows starts[i] .. ends[i]
+                # (lineup tuples -> int codes, so the change scan compares ints, not tuples)
+                codes = pd.factorize(sub[lineup_col])[0]
+                change = np.r_[True, codes[1:] != codes[:-1]]
+                starts = np.flatnonzero(change)
+                ends = np.r_[starts[1:], len(sub)] - 1
+
+                t = sub["t_elapsed"].to_numpy(dtype="float64")
+                start_t = np.minimum.reduceat(t, starts)
+                end_t = np.maximum.reduceat(t, starts)
+
+                # score deltas over the stint, only when both ends have a full score
+                nan = np.full(len(sub), np.nan)
+                hp = pd.to_numeric(sub["home_points"]).to_numpy(dtype="float64") if "home_points" in sub else nan
+                ap_ = pd.to_numeric(sub["away_points"]).to_numpy(dtype="float64") if "away_points" in sub else nan
+                d_home = hp[ends] - hp[starts]
+                d_away = ap_[ends] - ap_[starts]
+                known = ~(np.isnan(hp[starts]) | np.isnan(ap_[starts]) | np.isnan(hp[ends]) | np.isnan(ap_[ends]))
+                d_for, d_against = (d_home, d_away) if side == "home" else (d_away, d_home)
+                pf = np.full(len(starts), None, dtype=object)
+                pa = np.full(len(starts), None, dtype=object)
+                pf[known] = d_for[known].astype(np.int64).tolist()
+                pa[known] = d_against[known].astype(np.int64).tolist()
+
+                # short lineups (fewer than 5 ids on court) are padded with None
+                first_lineup = sub[lineup_col].to_numpy()[starts]
+                players = pd.DataFrame(
+                    [((tuple(l) if isinstance(l, tuple) else ()) + (None,) * 5)[:5] for l in first_lineup],
+                    columns=["p1", "p2", "p3", "p4", "p5"],
+                )
+
+                stints = pd.DataFrame({
+                    "season_year": args.year,
+                    "game_id": game_id,
+                    "team_id": team_id,
+                    "side": side,
+                    "stint_id": np.arange(1, len(starts) + 1),
+                    "start_t": start_t,
+                    "end_t": end_t,
+                    "duration_s": np.maximum(0.0, end_t - start_t),
+                    "points_for": pf,
+                    "points_against": pa,
+                })
+                game_stints.append(pd.concat([stints, players], axis=1))
 
             emit_stints("home", home_team_id, "home_lineup")
             emit_stints("away", away_team_id, "away_lineup")
@@ -185,35 +238,20 @@ def main():
         # =================================
         if not st.empty:
             st2 = st.dropna(subset=["player_id", "stat_type"]).copy()
-            st2["event_id"] = st2["event_id"].astype(str)
-            st2["player_id"] = st2["player_id"].astype(str)
-            st2["team_id"] = st2["team_id"].astype(str)
 
             ev_ctx = ev[["event_id", "is_clutch", "is_transition"]].copy()
             st2 = st2.merge(ev_ctx, on="event_id", how="left")
-            st2["is_clutch"] = st2["is_clutch"].fillna(0).astype(int)
-            st2["is_transition"] = st2["is_transition"].fillna(0).astype(int)
-
-            stat_type = st2["stat_type"].astype(str).str.lower()
-
-            st2["is_fga"] = stat_type.str.contains("fieldgoal").astype(int)
-            st2["is_fta"] = stat_type.str.contains("freethrow").astype(int)
-            st2["is_tov"] = stat_type.str.contains("turnover").astype(int)
-            st2["is_ast"] = stat_type.str.contains("assist").astype(int)
-            st2["is_reb"] = stat_type.str.contains("rebound").astype(int)
-            st2["is_pf"] = stat_type.str.contains("foul").astype(int)
-            st2["is_stl"] = stat_type.str.contains("steal").astype(int)
-            st2["is_blk"] = stat_type.str.contains("block").astype(int)
-
-            if "three_point_shot" in st2.columns:
-                st2["is_3pa"] = (st2["three_point_shot"].astype(str).str.lower() == "true").astype(int)
-            else:
-                st2["is_3pa"] = 0
+            st2["is_clutch"] = st2["is_clutch"].fillna(0).astype(np.int8)
+            st2["is_transition"] = st2["is_transition"].fillna(0).astype(np.int8)
+
+            # context-split attempts as plain columns so the agg below stays on the built-in sum
+            st2["is_clutch_fga"] = ((st2["is_fga"] == 1) & (st2["is_clutch"] == 1)).astype(np.int8)
+            st2["is_trans_fga"] = ((st2["is_fga"] == 1) & (st2["is_transition"] == 1)).astype(np.int8)
 
             # minutes estimate from stints within this game
             minutes_by_player = None
-            if stint_rows:
-                stints_df = pd.DataFrame([r for r in stint_rows if r["game_id"] == game_id])
+            if game_stints:
+                stints_df = pd.concat(game_stints, ignore_index=True)
                 if not stints_df.empty:
                     melted = stints_df.melt(
                         id_vars=["game_id", "team_id", "duration_s"],
@@ -234,8 +272,8 @@ def main():
                 pf=("is_pf", "sum"),
                 stl=("is_stl", "sum"),
                 blk=("is_blk", "sum"),
-                clutch_fga=("is_fga", lambda x: int(((x == 1) & (st2.loc[x.index, "is_clutch"] == 1)).sum())),
-                trans_fga=("is_fga", lambda x: int(((x == 1) & (st2.loc[x.index, "is_transition"] == 1)).sum())),
+                clutch_fga=("is_clutch_fga", "sum"),
+                trans_fga=("is_trans_fga", "sum"),
             ).reset_index()
 
             if minutes_by_player is not None:
@@ -246,7 +284,9 @@ def main():
             agg["season_year"] = args.year
             agg["game_id"] = game_id
 
-            player_rows.extend(agg.to_dict("records"))
+            player_frames.append(agg)
+
+        stint_frames.extend(game_stints)
 
         # =========================
         # 3) game context
@@ -271,13 +311,17 @@ def main():
     # =========================
     # write outputs
     # =========================
-    phase4_player = pd.DataFrame(player_rows)
-    phase4_stints = pd.DataFrame(stint_rows)
+    phase4_player = pd.concat(player_frames, ignore_index=True) if player_frames else pd.DataFrame()
+    # points_for/against are object columns (ints, None where the score is unknown); infer_objects
+    # turns them into the same int/float columns a frame built from row dicts would have
+    phase4_stints = pd.concat(stint_frames, ignore_index=True).infer_objects() if stint_frames else pd.DataFrame()
     phase4_games = pd.DataFrame(game_rows)
 
-    phase4_player.to_csv(out_dir / "phase4_player_event_rates_2025.csv", index=False)
-    phase4_stints.to_csv(out_dir / "phase4_lineup_stints_2025.csv", index=False)
-    phase4_games.to_csv(out_dir / "phase4_game_context_2025.csv", index=False)
+    written = [
+        write_table(phase4_player, out_dir / "phase4_player_event_rates_2025.csv", args.emit),
+        write_table(phase4_stints, out_dir / "phase4_lineup_stints_2025.csv", args.emit),
+        write_table(phase4_games, out_dir / "phase4_game_context_2025.csv", args.emit),
+    ]
 
     # =========================
     # team style (simple aggregate)
@@ -292,21 +336,22 @@ def main():
             tov=("tov", "sum"),
             ast=("ast", "sum"),
         )
-        # simple ratios
-        team_style["three_rate"] = team_style["three_pa"] / team_style["fga"].replace({0: pd.NA})
-        team_style["fta_rate"] = team_style["fta"] / team_style["fga"].replace({0: pd.NA})
-        team_style["tov_per_36"] = team_style["tov"] / (team_style["minutes_est"].replace({0: pd.NA}) / 36.0)
+        # simple ratios (float64 arrays, NaN where the denominator is 0)
+        fga = team_style["fga"].to_numpy(dtype="float64")
+        per36 = team_style["minutes_est"].to_numpy(dtype="float64") / 36.0
+        nan = np.full(len(team_style), np.nan)
+        team_style["three_rate"] = np.divide(team_style["three_pa"].to_numpy(dtype="float64"), fga, out=nan.copy(), where=fga != 0)
+        team_style["fta_rate"] = np.divide(team_style["fta"].to_numpy(dtype="float64"), fga, out=nan.copy(), where=fga != 0)
+        team_style["tov_per_36"] = np.divide(team_style["tov"].to_numpy(dtype="float64"), per36, out=nan.copy(), where=per36 != 0)
         team_style["season_year"] = args.year
-        team_style.to_csv(out_dir / "phase4_team_style_2025.csv", index=False)
     else:
-        pd.DataFrame().to_csv(out_dir / "phase4_team_style_2025.csv", index=False)
+        team_style = pd.DataFrame()
+    written.append(write_table(team_style, out_dir / "phase4_team_style_2025.csv", args.emit))
 
     print("done")
     print("wrote:")
-    print(" - phase4_player_event_rates_2025.csv")
-    print(" - phase4_lineup_stints_2025.csv")
-    print(" - phase4_game_context_2025.csv")
-    print(" - phase4_team_style_2025.csv")
+    for path in written:
+        print(f" - {path.name}")
 
 
 if __name__ == "__main__":
@@ -3,14 +3,25 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 
-def _read_csv(path: str) -> pd.DataFrame:
+def _read_csv(path: str, str_cols: tuple[str, ...] = ("playerId",)) -> pd.DataFrame:
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"missing file: {p}")
-    return pd.read_csv(p, low_memory=False)
+    # phase outputs may be written as parquet (--emit parquet); dtypes come from the file
+    if p.suffix.lower() == ".parquet":
+        df = pd.read_parquet(p)
+    else:
+        # arrow parser: multithreaded and types each column in one pass
+        df = pd.read_csv(p, engine="pyarrow")
+    # join keys cast once here, so the merges below all see str ids
+    for c in str_cols:
+        if c in df.columns:
+            df[c] = df[c].astype(str)
+    return df
 
 
 def _require_cols(df: pd.DataFrame, cols: list[str], label: str):
@@ -26,6 +37,11 @@ def _dedupe_on_playerId(df: pd.DataFrame, label: str) -> pd.DataFrame:
     return df
 
 
+def _align_to_spine(df: pd.DataFrame, spine: pd.DataFrame) -> pd.DataFrame:
+    # left-join by position: one row per spine player, in spine order (NaN where the phase has no row)
+    return df.set_index("playerId").reindex(spine["playerId"]).set_axis(spine.index)
+
+
 def _load_phase4_player_event_rates(path: str) -> pd.DataFrame:
     """
     Accepts either:
@@ -33,7 +49,7 @@ def _load_phase4_player_event_rates(path: str) -> pd.DataFrame:
       - phase form: playerId, teamId, ...
     Produces a per-player season aggregate with totals + derived shares.
     """
-    df = _read_csv(path)
+    df = _read_csv(path, str_cols=("playerId", "player_id"))
 
     # normalize column names
     rename = {}
@@ -54,12 +70,22 @@ def _load_phase4_player_event_rates(path: str) -> pd.DataFrame:
     ] if c in df.columns]
 
     # aggregate: per player season
-    agg = df.groupby(["playerId"], as_index=False)[sum_cols].sum() if sum_cols else df[["playerId"]].drop_duplicates()
+    # (categorical key -> grouping on int codes; unsorted is fine, the mart joins on playerId)
+    if sum_cols:
+        df[sum_cols] = df[sum_cols].apply(pd.to_numeric, errors="coerce")
+        df["playerId"] = df["playerId"].astype("category")
+        agg = df.groupby("playerId", observed=True, sort=False)[sum_cols].sum().reset_index()
+        agg["playerId"] = agg["playerId"].astype(str)
+    else:
+        agg = df[["playerId"]].drop_duplicates()
 
     # derived shares (safe)
+    # (one numpy divide per share, 0.0 where there are no attempts)
     if "fga" in agg.columns:
-        agg["clutch_fga_share"] = (agg.get("clutch_fga", 0) / agg["fga"]).where(agg["fga"] > 0, 0.0)
-        agg["trans_fga_share"] = (agg.get("trans_fga", 0) / agg["fga"]).where(agg["fga"] > 0, 0.0)
+        fga = agg["fga"].to_numpy(dtype="float64")
+        for share, c in [("clutch_fga_share", "clutch_fga"), ("trans_fga_share", "trans_fga")]:
+            num = agg[c].to_numpy(dtype="float64") if c in agg.columns else np.zeros(len(agg))
+            agg[share] = np.divide(num, fga, out=np.zeros(len(agg)), where=fga > 0)
 
     # rename to avoid collisions with phase2 shooting fga/fta/etc
     # these are "phase4_" totals (play-by-play derived)
@@ -69,6 +95,15 @@ def _load_phase4_player_event_rates(path: str) -> pd.DataFrame:
     return agg
 
 
+def write_table(df: pd.DataFrame, path: Path, emit: str) -> Path:
+    if emit == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="snappy")
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
 def main():
     ap = argparse.ArgumentParser(description="Build a single player feature mart by joining phase0..phase3 (+ optional phase4).")
     ap.add_argument("--phase0", required=True, help="phase0_players_index_YYYY.csv (canonical spine)")
@@ -78,40 +113,39 @@ def main():
     ap.add_argument("--phase3_profile", required=False, help="phase3_player_shot_profile_YYYY_rekeyed.csv")
     ap.add_argument("--phase4_event_rates", required=False, help="phase4_player_event_rates_YYYY(_canonical).csv")
     ap.add_argument("--out", required=True, help="output csv path, e.g., derived/player_feature_mart_2025.csv")
+    ap.add_argument("--emit", choices=["csv", "parquet"], default="csv", help="Write the mart as csv or parquet")
     args = ap.parse_args()
 
     # ---- phase0 spine
     p0 = _read_csv(args.phase0)
     _require_cols(p0, ["playerId", "playerName", "teamId", "pos"], "phase0")
-    p0["playerId"] = p0["playerId"].astype(str)
     p0 = _dedupe_on_playerId(p0, "phase0")
 
-    mart = p0.copy()
+    # each phase is deduped on playerId, so it can be aligned to the spine and the
+    # whole mart assembled in one concat instead of a merge (and copy) per phase
+    parts = [p0]
 
     # ---- phase1 workload
     if args.phase1:
         p1 = _read_csv(args.phase1)
         _require_cols(p1, ["playerId"], "phase1")
-        p1["playerId"] = p1["playerId"].astype(str)
         p1 = _dedupe_on_playerId(p1, "phase1")
         # prefix non-key cols to avoid collision
         p1 = p1.rename(columns={c: f"phase1_{c}" for c in p1.columns if c != "playerId"})
-        mart = mart.merge(p1, on="playerId", how="left")
+        parts.append(_align_to_spine(p1, p0))
 
     # ---- phase2 shooting
     if args.phase2_shooting:
         p2s = _read_csv(args.phase2_shooting)
         _require_cols(p2s, ["playerId"], "phase2_shooting")
-        p2s["playerId"] = p2s["playerId"].astype(str)
         p2s = _dedupe_on_playerId(p2s, "phase2_shooting")
         p2s = p2s.rename(columns={c: f"phase2shoot_{c}" for c in p2s.columns if c != "playerId"})
-        mart = mart.merge(p2s, on="playerId", how="left")
+        parts.append(_align_to_spine(p2s, p0))
 
     # ---- phase2 impact/misc
     if args.phase2_impact:
         p2i = _read_csv(args.phase2_impact)
         _require_cols(p2i, ["playerId"], "phase2_impact")
-        p2i["playerId"] = p2i["playerId"].astype(str)
 
         # keep useful columns; drop noisy duplicates if present
         drop_cols = [c for c in ["oldPlayerId", "oldTeamId", "playerName", "pos", "teamId"] if c in p2i.columns]
@@ -120,13 +154,12 @@ def main():
 
         p2i = _dedupe_on_playerId(p2i, "phase2_impact")
         p2i = p2i.rename(columns={c: f"phase2imp_{c}" for c in p2i.columns if c != "playerId"})
-        mart = mart.merge(p2i, on="playerId", how="left")
+        parts.append(_align_to_spine(p2i, p0))
 
     # ---- phase3 shot profile
     if args.phase3_profile:
         p3 = _read_csv(args.phase3_profile)
         _require_cols(p3, ["playerId"], "phase3_profile")
-        p3["playerId"] = p3["playerId"].astype(str)
 
         # drop duplicate identity cols from phase3
         drop_cols = [c for c in ["playerName", "teamId", "pos", "age"] if c in p3.columns]
@@ -135,14 +168,15 @@ def main():
 
         p3 = _dedupe_on_playerId(p3, "phase3_profile")
         p3 = p3.rename(columns={c: f"phase3_{c}" for c in p3.columns if c != "playerId"})
-        mart = mart.merge(p3, on="playerId", how="left")
+        parts.append(_align_to_spine(p3, p0))
 
     # ---- optional phase4 pbp-derived per-player totals
     if args.phase4_event_rates:
         p4 = _load_phase4_player_event_rates(args.phase4_event_rates)
-        p4["playerId"] = p4["playerId"].astype(str)
         p4 = _dedupe_on_playerId(p4, "phase4_event_rates")
-        mart = mart.merge(p4, on="playerId", how="left")
+        parts.append(_align_to_spine(p4, p0))
+
+    mart = pd.concat(parts, axis=1).reset_index(drop=True)
 
     # ---- quick sanity columns
     mart["season_year"] = (
@@ -154,7 +188,7 @@ def main():
     # ---- write
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    mart.to_csv(out_path, index=False)
+    out_path = write_table(mart, out_path, args.emit)
 
     # ---- report
     print("wrote:", out_path)
@@ -5,15 +5,23 @@ from pathlib import Path
 
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
+
+try:
+    import orjson  # optional: C serializer, much faster than json.dump on the nested records
+except ImportError:
+    orjson = None
 
 BASE = Path(__file__).resolve().parents[1]
 RAW = BASE / "raw_data"
 OUT = BASE / "data" / "players_test.json"
+CACHE_DIR = BASE / "data" / "cache"
 
 # ---------- helpers ----------
 
 def clamp(x, lo, hi):
-    return max(lo, min(hi, x))
+    # works on whole arrays; NaN clamps to hi, same as max(lo, min(hi, nan)) did on scalars
+    return np.where(np.isnan(x), hi, np.clip(x, lo, hi))
 
 
 def safe_div(num, den):
@@ -22,79 +30,77 @@ def safe_div(num, den):
     return num / den
 
 
-def pct_rank(series: pd.Series) -> pd.Series:
-    s = series.copy()
-    s = pd.to_numeric(s, errors="coerce")
-    return s.rank(pct=True)
+def to_float(x) -> np.ndarray:
+    # column (or scalar / None) -> float64 array, NaN where missing or unparseable
+    x = pd.to_numeric(x, errors="coerce")
+    if isinstance(x, pd.Series):
+        return x.to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(x, dtype="float64")
+
+
+def pct_ranks(cols: dict) -> pd.DataFrame:
+    # league percentile of every column in one rank call (ties share the average rank, NaN stays NaN)
+    return pd.DataFrame({k: to_float(v) for k, v in cols.items()}).rank(pct=True)
 
 
-def rating(series: pd.Series) -> pd.Series:
-    r = 25 + (pct_rank(series).fillna(0) * 74)
+def ratings(raws: dict) -> pd.DataFrame:
+    r = 25 + (pct_ranks(raws).fillna(0) * 74)
     r = r.clip(lower=25, upper=99)
     return r.round().astype(int)
 
 
-def per36(stat: pd.Series, mpg: pd.Series) -> pd.Series:
-    stat = pd.to_numeric(stat, errors="coerce")
-    mpg = pd.to_numeric(mpg, errors="coerce")
+def per36(stat, mpg) -> np.ndarray:
+    # NaN where mpg is missing or 0; a missing stat column (None) broadcasts to all-NaN
+    s, m = np.broadcast_arrays(to_float(stat), to_float(mpg))
+    return np.divide(s, m / 36.0, out=np.full(s.shape, np.nan), where=m > 0)
 
-    if not isinstance(stat, pd.Series):
-        stat = pd.Series([stat])
-    if not isinstance(mpg, pd.Series):
-        mpg = pd.Series([mpg])
 
-    if len(stat) == 1 and len(mpg) > 1:
-        stat = pd.Series([stat.iloc[0]] * len(mpg), index=mpg.index)
-    if len(mpg) == 1 and len(stat) > 1:
-        mpg = pd.Series([mpg.iloc[0]] * len(stat), index=stat.index)
+def split_name(name: pd.Series) -> tuple[pd.Series, pd.Series]:
+    # first word / the rest, single-spaced; a blank name splits as "nan" like str(nan) did
+    parts = name.fillna("nan").astype(str).str.split()
+    return parts.str[0].fillna(""), parts.str[1:].str.join(" ")
 
-    idx = stat.index if len(stat) >= len(mpg) else mpg.index
-    stat = stat.reindex(idx)
-    mpg = mpg.reindex(idx)
 
-    return pd.Series(np.where(mpg > 0, stat / (mpg / 36.0), np.nan), index=idx)
+def norm_pos(pos: pd.Series) -> np.ndarray:
+    # C if the listed position has a C, else F, else G (blank/unknown -> G)
+    p = pos.astype(str).str.upper()
+    return np.where(
+        p.str.contains("C", regex=False, na=False), "C",
+        np.where(p.str.contains("F", regex=False, na=False), "F", "G"),
+    )
 
 
-def split_name(name: str):
-    parts = str(name).strip().split()
-    if not parts:
-        return "", ""
-    if len(parts) == 1:
-        return parts[0], ""
-    return parts[0], " ".join(parts[1:])
+# finisher, shooter, creator, defender, rebounder
+ARCHETYPES = np.array(["Two-Way Finisher", "Perimeter Shooter", "Primary Creator", "Defensive Specialist", "Rebounding Big"])
 
 
-def norm_pos(pos: str) -> str:
-    p = str(pos).upper()
-    if "C" in p:
-        return "C"
-    if "F" in p:
-        return "F"
-    if "G" in p:
-        return "G"
-    return "G"
+def archetype_from_top(fin, sho, play, deff, reb) -> np.ndarray:
+    # highest of the five ratings per player; ties go to the earlier one
+    return ARCHETYPES[np.argmax(np.stack([fin, sho, play, deff, reb], axis=1), axis=1)]
 
 
-def archetype_from_top(fin, sho, play, deff, reb):
-    top = max(
-        [("Finisher", fin), ("Shooter", sho), ("Creator", play), ("Defender", deff), ("Rebounder", reb)],
-        key=lambda x: x[1],
-    )[0]
-    return {
-        "Finisher": "Two-Way Finisher",
-        "Shooter": "Perimeter Shooter",
-        "Creator": "Primary Creator",
-        "Defender": "Defensive Specialist",
-        "Rebounder": "Rebounding Big",
-    }.get(top, "Two-Way Finisher")
+def default_shot_shares(pos: np.ndarray):
+    # (rim, mid, three) defaults per position, as arrays aligned with pos
+    is_g, is_c = pos == "G", pos == "C"
+    return (
+        np.select([is_g, is_c], [0.28, 0.45], 0.32),
+        np.select([is_g, is_c], [0.18, 0.18], 0.20),
+        np.select([is_g, is_c], [0.34, 0.08], 0.22),
+    )
 
 
-def default_shot_shares(pos: str):
-    if pos == "G":
-        return 0.28, 0.18, 0.34
-    if pos == "C":
-        return 0.45, 0.18, 0.08
-    return 0.32, 0.20, 0.22
+def read_table(path: Path, usecols: list[str] | None = None) -> pd.DataFrame:
+    # parsed csvs are cached whole as parquet under data/cache and usecols is applied on load.
+    # a cache older than its csv, or whose columns differ from the csv header, is a miss
+    cached = CACHE_DIR / f"{path.stem}.parquet"
+    if cached.exists() and cached.stat().st_mtime >= path.stat().st_mtime:
+        header = pd.read_csv(path, nrows=0).columns.tolist()
+        if pq.read_schema(cached).names == header:
+            return pd.read_parquet(cached, columns=usecols)
+    df = pd.read_csv(path, engine="pyarrow")
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(cached, index=False, compression="snappy")
+    return df if usecols is None else df[usecols]
 
 
 # ---------- load data ----------
@@ -103,19 +109,28 @@ p0_path = RAW / "phase0_players_index_2025_with_bio.csv"
 if not p0_path.exists():
     p0_path = RAW / "phase0_players_index_2025_merged.csv"
 
-p0 = pd.read_csv(p0_path)
+# multithreaded arrow parser on a cache miss. The phase0-3 tables are read whole: their overlapping column names
+# decide the merge suffixes below. phase4 (per game, the big one) only needs the aggregated columns.
+P4_COLS = [
+    "player_id", "team_id", "game_id", "fga", "fta", "three_pa", "tov", "ast", "reb", "pf", "stl", "blk",
+    "clutch_fga", "trans_fga", "minutes_est",
+]
 
-p1 = pd.read_csv(RAW / "phase1_players_workload_2025.csv")
-p2_box = pd.read_csv(RAW / "phase2_players_box_2025.csv")
-p2_shoot = pd.read_csv(RAW / "phase2_players_shooting_2025.csv")
-p2_misc = pd.read_csv(RAW / "phase2_impact_misc_2025_rekeyed.csv")
-p3 = pd.read_csv(RAW / "phase3_player_shot_profile_2025_rekeyed.csv")
-p4 = pd.read_csv(RAW / "phase4_canonical" / "phase4_player_event_rates_2025_canonical.csv")
+p0 = read_table(p0_path)
+
+p1 = read_table(RAW / "phase1_players_workload_2025.csv")
+p2_box = read_table(RAW / "phase2_players_box_2025.csv")
+p2_shoot = read_table(RAW / "phase2_players_shooting_2025.csv")
+p2_misc = read_table(RAW / "phase2_impact_misc_2025_rekeyed.csv")
+p3 = read_table(RAW / "phase3_player_shot_profile_2025_rekeyed.csv")
+p4 = read_table(RAW / "phase4_canonical" / "phase4_player_event_rates_2025_canonical.csv", usecols=P4_COLS)
 
 # ---------- phase4 aggregate ----------
 
+# categorical key -> grouping on int codes; unsorted is fine, the join below aligns by playerId
+p4["player_id"] = p4["player_id"].astype("category")
 p4_agg = (
-    p4.groupby("player_id", as_index=False)
+    p4.groupby("player_id", as_index=False, observed=True, sort=False)
     .agg(
         games=("game_id", "nunique"),
         fga=("fga", "sum"),
@@ -134,6 +149,7 @@ p4_agg = (
     )
 )
 p4_agg = p4_agg.rename(columns={"player_id": "playerId"})
+p4_agg["playerId"] = p4_agg["playerId"].astype(str)
 p4_agg["mpg_p4"] = p4_agg["minutes_est"] / p4_agg["games"].replace({0: np.nan})
 p4_agg["fga36_p4"] = per36(p4_agg["fga"], p4_agg["mpg_p4"])
 p4_agg["three_pa36_p4"] = per36(p4_agg["three_pa"], p4_agg["mpg_p4"])
@@ -149,22 +165,52 @@ p4_agg["trans_rate"] = p4_agg["trans_fga"] / p4_agg["fga"].replace({0: np.nan})
 
 # ---------- merge ----------
 
-df = p0.copy()
+# every phase has one row per player, so each is aligned to p0's rows and the frame is built
+# with one concat instead of a left merge (and full copy) per phase. Clashing column names get
+# the same _x/_y suffixes the chained merges gave them.
+frames = [p0]
 for extra in (p1, p2_box, p2_shoot, p2_misc, p3, p4_agg):
     key = "playerId" if "playerId" in extra.columns else "player_id"
     if key != "playerId":
         extra = extra.rename(columns={key: "playerId"})
-    df = df.merge(extra, on="playerId", how="left")
-
-# fallback mpg/g from phase2 misc
+    dupes = extra["playerId"][extra["playerId"].duplicated()]
+    if not dupes.empty:
+        raise RuntimeError(f"duplicate playerId rows in a phase table: {dupes.unique()[:5].tolist()}")
+
+    seen = set().union(*(f.columns for f in frames)) - {"playerId"}
+    clash = seen & set(extra.columns)
+    if clash:
+        frames = [f.rename(columns={c: f"{c}_x" for c in clash}) for f in frames]
+        extra = extra.rename(columns={c: f"{c}_y" for c in clash})
+    frames.append(extra.set_index("playerId").reindex(p0["playerId"]).set_axis(p0.index))
+
+df = pd.concat(frames, axis=1)
+
+# g (phase1 and phase2 misc) and tov (phase2 box per game, phase4 season total) clash in the
+# merge: games come from phase1's g_x, phase2's g_y where blank; tov is phase2's per-game tov_x
+for name, sources in (("g", ["g_x", "g_y"]), ("tov", ["tov_x"])):
+    if name not in df.columns:
+        vals = [pd.to_numeric(df[c], errors="coerce") for c in sources if c in df.columns]
+        df[name] = pd.concat(vals, axis=1).bfill(axis=1).iloc[:, 0] if vals else np.nan
+
+# fallback mpg from phase2 misc
 if "mpg" not in df.columns:
     df["mpg"] = pd.NA
-if "g" not in df.columns:
-    df["g"] = pd.NA
 
 if "mp" in df.columns:
     df["mpg"] = df["mpg"].fillna(df["mp"] / df["g"])  # mpg from total minutes
 
+# numeric inputs coerced once (float64, NaN for blanks/junk); everything below reads them as-is
+NUMERIC = [
+    "heightIn", "weightLb", "g", "mpg", "minutes_est", "usageProxyPer36", "onOff_plusMinus_per100",
+    "fg3Pct", "rim_att_share", "mid_att_share", "three_att_share", "rim_fg", "mid_fg", "three_fg",
+    "trans_rate", "clutch_rate", "mpg_p4", "fga36_p4", "three_pa36_p4", "ast36_p4", "tov36_p4",
+    "pf36_p4", "reb36_p4", "stl36_p4", "blk36_p4",
+]
+for c in NUMERIC:
+    if c in df.columns:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+
 # ---------- core per36 stats ----------
 
 fga36 = per36(df.get("fga"), df.get("mpg"))
@@ -181,129 +227,234 @@ pf36 = per36(df.get("pf"), df.get("mpg"))
 
 # ---------- raw attribute signals ----------
 
-finishing_raw = (fga36 - fg3a36) + (0.5 * fta36)
+def weighted(cols: list[str], w: list[float]) -> np.ndarray:
+    # blank (or missing) inputs count as 0; one block cast + one matrix-vector product per signal
+    X = np.nan_to_num(df.reindex(columns=cols).to_numpy(dtype="float64"))
+    return X @ np.array(w)
+
+
 finishing_raw = (
-    finishing_raw
+    (fga36 - fg3a36)
+    + (0.5 * fta36)
     + (per36(df.get("rim_fga"), df.get("mpg")) * 0.4)
     + (per36(df.get("paint_fga"), df.get("mpg")) * 0.2)
-    + (df.get("fga36_p4").fillna(0) * 0.3)
-)
-shooting_raw = (
-    (pd.to_numeric(df.get("fg3Pct"), errors="coerce").fillna(0) * 0.6)
-    + (pd.to_numeric(df.get("three_att_share"), errors="coerce").fillna(0) * 100 * 0.25)
-    + (pd.to_numeric(df.get("three_fg"), errors="coerce").fillna(0) * 25 * 0.15)
-    + (df.get("three_pa36_p4").fillna(0) * 0.4)
+    + weighted(["fga36_p4"], [0.3])
 )
+shooting_raw = weighted(["fg3Pct", "three_att_share", "three_fg", "three_pa36_p4"], [0.6, 25.0, 3.75, 0.4])
 playmaking_raw = (
     ast36
-    + (df.get("ast36_p4").fillna(0) * 0.6)
     - (0.6 * tov36)
-    - (0.4 * df.get("tov36_p4").fillna(0))
-    + (pd.to_numeric(df.get("usageProxyPer36"), errors="coerce").fillna(0) * 5)
+    + weighted(["ast36_p4", "tov36_p4", "usageProxyPer36"], [0.6, -0.4, 5.0])
 )
 defense_raw = (
     stl36
     + (1.2 * blk36)
-    + (df.get("stl36_p4").fillna(0) * 0.6)
-    + (df.get("blk36_p4").fillna(0) * 0.8)
-    + (pd.to_numeric(df.get("onOff_plusMinus_per100"), errors="coerce").fillna(0) / 5)
+    + weighted(["stl36_p4", "blk36_p4", "onOff_plusMinus_per100"], [0.6, 0.8, 0.2])
 )
-rebounding_raw = trb36 + (0.5 * orb36) + (df.get("reb36_p4").fillna(0) * 0.6)
-stamina_raw = pd.to_numeric(df.get("mpg"), errors="coerce").fillna(0) + (df.get("mpg_p4").fillna(0) * 0.6)
-
-finishing = rating(finishing_raw)
-shooting = rating(shooting_raw)
-playmaking = rating(playmaking_raw)
-defense = rating(defense_raw)
-rebounding = rating(rebounding_raw)
-stamina = rating(stamina_raw)
+rebounding_raw = trb36 + (0.5 * orb36) + weighted(["reb36_p4"], [0.6])
+stamina_raw = weighted(["mpg", "mpg_p4"], [1.0, 0.6])
+
+# ---------- ratings (attributes + zone ratings, ranked together) ----------
+
+R = ratings({
+    "finishing": finishing_raw,
+    "shooting": shooting_raw,
+    "playmaking": playmaking_raw,
+    "defense": defense_raw,
+    "rebounding": rebounding_raw,
+    "stamina": stamina_raw,
+    "rim": df.get("rim_fg"),
+    "mid": df.get("mid_fg"),
+    "three": df.get("three_fg"),
+    "stl": stl36,
+    "blk": blk36,
+})
+finishing, shooting, playmaking = R["finishing"], R["shooting"], R["playmaking"]
+defense, rebounding, stamina = R["defense"], R["rebounding"], R["stamina"]
 
 ovr = ((finishing + shooting + playmaking + defense + rebounding + stamina) / 6).round().astype(int)
 
-# ---------- zone ratings ----------
-
-rim_rating = rating(df.get("rim_fg"))
-mid_rating = rating(df.get("mid_fg"))
-three_rating = rating(df.get("three_fg"))
-
-stl_rating = rating(stl36)
-blk_rating = rating(blk36)
+rim_rating, mid_rating, three_rating = R["rim"], R["mid"], R["three"]
+stl_rating, blk_rating = R["stl"], R["blk"]
 
 # ---------- build output ----------
+# every derived field is computed on whole columns here; the loop at the end only nests them
+
+def col(name: str) -> pd.Series:
+    return df[name] if name in df.columns else pd.Series([None] * len(df), index=df.index)
+
+
+def num(name: str) -> np.ndarray:
+    # all NaN if the column is absent (present ones are already float64)
+    return to_float(col(name))
+
+
+def mix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # mean of phase2 and phase4 values, whichever of them is there
+    return np.where(np.isnan(b), a, np.where(np.isnan(a), b, (a + b) / 2))
+
+
+names = col("playerName")
+first_names, last_names = split_name(names)
+pos = norm_pos(col("pos"))
+
+h = num("heightIn")
+w = num("weightLb")
+height = np.where(np.isnan(h), 72, np.trunc(h)).astype(int)
+weight = np.where(np.isnan(w), 160.0, w)
+
+fin = finishing.to_numpy()
+sho = shooting.to_numpy()
+ply = playmaking.to_numpy()
+dfn = defense.to_numpy()
+reb = rebounding.to_numpy()
+sta = stamina.to_numpy()
+
+rim_share = num("rim_att_share")
+mid_share = num("mid_att_share")
+three_share = num("three_att_share")
+no_shares = np.isnan(rim_share) | np.isnan(mid_share) | np.isnan(three_share)
+d_rim, d_mid, d_three = default_shot_shares(pos)
+rim_share = clamp(np.where(no_shares, d_rim, rim_share), 0.02, 0.75)
+mid_share = clamp(np.where(no_shares, d_mid, mid_share), 0.02, 0.60)
+three_share = clamp(np.where(no_shares, d_three, three_share), 0.02, 0.70)
+
+speed = np.rint(clamp(95 - (height - 66) * 1.2, 60, 95)).astype(int)
+postup_bias = clamp(((height - 68) / 20.0) + ((reb - 50) / 200.0), 0.05, 0.7)
+
+pf_mix = mix(pf36, num("pf36_p4"))
+ast_mix = mix(ast36, num("ast36_p4"))
+tov_mix = mix(tov36, num("tov36_p4"))
+
+# blanks -> defaults, one mask per column (minutes_est stays NaN: the season load falls back on it)
+g = num("g")
+games = np.where(np.isnan(g), 0, np.trunc(g)).astype(int)
+mpg = np.nan_to_num(num("mpg"), nan=0.0)
+minutes_est = num("minutes_est")
+trans_rate = np.nan_to_num(num("trans_rate"), nan=0.0)
+clutch_rate = np.nan_to_num(num("clutch_rate"), nan=0.0)
+# a blank usage (NaN) is truthy in the old `or 0`, so only a missing column counts as 0
+usage = num("usageProxyPer36") if "usageProxyPer36" in df.columns else np.zeros(len(df))
+
+# league percentiles, ranked once over all players (missing -> 0, as in ratings())
+ranks = pct_ranks({"tov": tov36, "pf_mix": pf_mix, "ast_mix": ast_mix, "tov_mix": tov_mix, "games": games}).fillna(0)
+tov_rank = ranks["tov"].to_numpy()
+pf_mix_rank = ranks["pf_mix"].to_numpy()
+ast_mix_rank = ranks["ast_mix"].to_numpy()
+tov_mix_rank = ranks["tov_mix"].to_numpy()
+games_rank = ranks["games"].to_numpy()
+
+out = pd.DataFrame({
+    "playerId": col("playerId"),
+    "name": names,
+    "first": first_names,
+    "last": last_names,
+    "teamId": col("teamId").where(col("teamId").notna(), col("team_id")),
+    "pos": pos,
+    "archetype": archetype_from_top(fin, sho, ply, dfn, reb),
+    "height": height,
+    "weight": weight,
+    "fin": fin, "sho": sho, "ply": ply, "dfn": dfn, "reb": reb, "sta": sta,
+    "vision": clamp(ply / 100.0, 0.4, 0.9),
+    "bbiq": clamp(dfn / 100.0, 0.4, 0.9),
+    "composure": clamp(sho / 100.0, 0.35, 0.9),
+    "riskTolerance": clamp(usage * 2, 0.2, 0.8),
+    "aggressionBias": clamp(fin / 100.0, 0.35, 0.9),
+    "speed": speed,
+    "acceleration": np.rint(clamp(speed + 2, 60, 95)).astype(int),
+    "lateral": np.rint(clamp(speed - 2, 60, 95)).astype(int),
+    "vertical": np.rint(clamp(60 + (reb - 50) * 0.4, 55, 95)).astype(int),
+    "strength": np.rint(clamp(50 + (weight - 140) * 0.4, 50, 95)).astype(int),
+    "wingspan": height + 6,
+    "rim_rating": rim_rating.to_numpy(),
+    "mid_rating": mid_rating.to_numpy(),
+    "three_rating": three_rating.to_numpy(),
+    "rim_share": rim_share,
+    "mid_share": mid_share,
+    "three_share": three_share,
+    "offDribble": np.rint(0.6 * sho + 0.4 * ply).astype(int),
+    "discipline": np.rint(clamp(100 - (tov_rank * 50), 40, 95)).astype(int),
+    "helpDefense": np.rint((dfn + reb) / 2).astype(int),
+    "stl_rating": stl_rating.to_numpy(),
+    "blk_rating": blk_rating.to_numpy(),
+    "foul_tendency": clamp(pf_mix_rank * 0.35, 0.08, 0.35),
+    "confidenceBaseline": clamp(sho / 100.0, 0.35, 0.85),
+    "pressureHandling": clamp((dfn + fin) / 200.0 + (clutch_rate * 0.2), 0.35, 0.92),
+    "clutchFactor": clamp((ply + sho) / 200.0 + (clutch_rate * 0.35), 0.3, 0.9),
+    "injuryRisk": clamp(0.4 - (games_rank * 0.3), 0.08, 0.4),
+    "recoveryRate": clamp(0.5 + ((sta - 50) / 100.0), 0.4, 0.9),
+    "drive_bias": clamp(rim_share + ((fin - 50) / 200.0), 0.1, 0.8),
+    "pullup_bias": clamp(mid_share + ((sho - 50) / 300.0), 0.05, 0.6),
+    "kickout_bias": clamp(ast_mix_rank * 0.6, 0.1, 0.7),
+    "postup_bias": postup_bias,
+    "pass_risk": clamp(tov_mix_rank * 0.6, 0.05, 0.7),
+    "pnrBh_freq": clamp(0.12 + (ply / 400.0), 0.05, 0.45),
+    "pnrBh_eff": clamp((ply + fin) / 200.0, 0.35, 0.85),
+    "pnrRoll_freq": clamp(0.05 + (reb / 400.0), 0.02, 0.35),
+    "finReb_eff": clamp((fin + reb) / 200.0, 0.35, 0.85),
+    "spotUp_freq": clamp(0.08 + (sho / 500.0), 0.05, 0.35),
+    "spotUp_eff": clamp(sho / 100.0, 0.3, 0.8),
+    "iso_freq": clamp(0.06 + (fin / 500.0), 0.05, 0.3),
+    "iso_eff": clamp((fin + sho) / 200.0 + (clutch_rate * 0.15), 0.3, 0.85),
+    "postUp_freq": clamp(0.05 + (postup_bias * 0.3), 0.02, 0.35),
+    "trans_freq": clamp(0.06 + (sta / 600.0) + (trans_rate * 0.5), 0.05, 0.5),
+    "trans_eff": clamp((fin + sta) / 200.0, 0.35, 0.85),
+    "fatigue": clamp((mpg / 40.0) * 0.35, 0.05, 0.35),
+    "minutesLoad7d": np.rint(mpg * 3.5).astype(int),
+    "minutesLoadSeason": np.rint(np.where(np.isnan(minutes_est), mpg * games, minutes_est)).astype(int),
+    "processingSpeed": clamp(ply / 100.0, 0.4, 0.95),
+    "consistency": clamp(ovr.to_numpy() / 100.0, 0.4, 0.95),
+})
+
+# roles (from the ratings): one mask per rule, then the per-player lists are zipped together
+ball_role = np.where(ply >= 80, "PrimaryBallhandler", "SecondaryBallhandler")
+spot_up = sho >= 80
+trans_finisher = fin >= 80
+roller = (reb >= 80) | np.isin(pos, ["C", "F"])
+out["offensiveRoles"] = [
+    [b] + (["SpotUp"] if s else []) + (["TransitionFinisher"] if t else []) + (["Roller"] if rl else [])
+    for b, s, t, rl in zip(ball_role.tolist(), spot_up.tolist(), trans_finisher.tolist(), roller.tolist())
+]
+def_role = np.where(dfn >= 80, np.where(pos == "G", "PointOfAttack", "RimProtector"), "Helper")
+out["defensiveRoles"] = [[d] for d in def_role.tolist()]
+
+# compact storage for the finished columns (ratings are 25..99, heights whole inches, three
+# positions); every sum above ran on the wide arrays, so the narrow types cannot overflow
+RATING_COLS = [
+    "fin", "sho", "ply", "dfn", "reb", "sta",
+    "rim_rating", "mid_rating", "three_rating", "stl_rating", "blk_rating",
+]
+out[RATING_COLS] = out[RATING_COLS].astype("int8")
+out["height"] = out["height"].astype("uint8")
+out["pos"] = pd.Categorical(out["pos"], categories=["G", "F", "C"])
+
+
+# fields that are the same for every player: built once and shared by all records (read-only,
+# they are only serialized)
+CONTRACT = {"yearsRemaining": 1, "salary": 100000}
+HANDEDNESS = {"primaryHand": "R"}
+INJURY_STATUS = {
+    "isInjured": False,
+    "type": None,
+    "severity": 0,
+    "expectedDaysOut": 0,
+    "playingLimited": False,
+}
+
+
+def player_record(r: dict) -> dict:
+    fin, sho, ply, dfn, reb, pos = r["fin"], r["sho"], r["ply"], r["dfn"], r["reb"], r["pos"]
 
-players = []
-
-for i, row in df.iterrows():
-    player_id = row.get("playerId")
-    name = row.get("playerName")
-    first, last = split_name(name)
-    pos = norm_pos(row.get("pos"))
-
-    h = pd.to_numeric(row.get("heightIn"), errors="coerce")
-    w = pd.to_numeric(row.get("weightLb"), errors="coerce")
-    height = int(h) if pd.notna(h) else 72
-    weight = float(w) if pd.notna(w) else 160.0
-
-    fin = int(finishing.iloc[i])
-    sho = int(shooting.iloc[i])
-    ply = int(playmaking.iloc[i])
-    dfn = int(defense.iloc[i])
-    reb = int(rebounding.iloc[i])
-    sta = int(stamina.iloc[i])
-
-    rim_share = pd.to_numeric(row.get("rim_att_share"), errors="coerce")
-    mid_share = pd.to_numeric(row.get("mid_att_share"), errors="coerce")
-    three_share = pd.to_numeric(row.get("three_att_share"), errors="coerce")
-
-    if pd.isna(rim_share) or pd.isna(mid_share) or pd.isna(three_share):
-        rim_share, mid_share, three_share = default_shot_shares(pos)
-
-    rim_share = clamp(float(rim_share), 0.02, 0.75)
-    mid_share = clamp(float(mid_share), 0.02, 0.60)
-    three_share = clamp(float(three_share), 0.02, 0.70)
-
-    speed = int(round(clamp(95 - (height - 66) * 1.2, 60, 95)))
-    acceleration = int(round(clamp(speed + 2, 60, 95)))
-    lateral = int(round(clamp(speed - 2, 60, 95)))
-    vertical = int(round(clamp(60 + (reb - 50) * 0.4, 55, 95)))
-    strength = int(round(clamp(50 + (weight - 140) * 0.4, 50, 95)))
-    wingspan = int(round(height + 6))
-
-    discipline = int(round(clamp(100 - (pct_rank(pd.Series([tov36[i]])).iloc[0] * 50), 40, 95)))
-    pf_mix = np.nanmean([pf36[i], row.get("pf36_p4")]) if pd.notna(row.get("pf36_p4")) else pf36[i]
-    foul_tendency = clamp(float(pct_rank(pd.Series([pf_mix])).iloc[0] * 0.35), 0.08, 0.35)
-
-    drive_bias = clamp(rim_share + ((fin - 50) / 200.0), 0.1, 0.8)
-    pullup_bias = clamp(mid_share + ((sho - 50) / 300.0), 0.05, 0.6)
-    ast_mix = np.nanmean([ast36[i], row.get("ast36_p4")]) if pd.notna(row.get("ast36_p4")) else ast36[i]
-    kickout_bias = clamp(float(pct_rank(pd.Series([ast_mix])).iloc[0] * 0.6), 0.1, 0.7)
-    postup_bias = clamp(((height - 68) / 20.0) + ((reb - 50) / 200.0), 0.05, 0.7)
-    tov_mix = np.nanmean([tov36[i], row.get("tov36_p4")]) if pd.notna(row.get("tov36_p4")) else tov36[i]
-    pass_risk = clamp(float(pct_rank(pd.Series([tov_mix])).iloc[0] * 0.6), 0.05, 0.7)
-
-    g = pd.to_numeric(row.get("g"), errors="coerce")
-    games = int(g) if pd.notna(g) else 0
-    mpg_val = pd.to_numeric(row.get("mpg"), errors="coerce")
-    mpg = float(mpg_val) if pd.notna(mpg_val) else 0.0
-    minutes_est_val = pd.to_numeric(row.get("minutes_est"), errors="coerce")
-    minutes_est = float(minutes_est_val) if pd.notna(minutes_est_val) else None
-    trans_rate = pd.to_numeric(row.get("trans_rate"), errors="coerce")
-    clutch_rate = pd.to_numeric(row.get("clutch_rate"), errors="coerce")
-    if pd.isna(trans_rate):
-        trans_rate = 0.0
-    if pd.isna(clutch_rate):
-        clutch_rate = 0.0
-
-    players.append({
-        "playerId": player_id,
-        "firstName": first,
-        "lastName": last,
-        "displayName": name,
-        "teamId": row.get("teamId") if pd.notna(row.get("teamId")) else row.get("team_id"),
+    return {
+        "playerId": r["playerId"],
+        "firstName": r["first"],
+        "lastName": r["last"],
+        "displayName": r["name"],
+        "teamId": r["teamId"],
         "position": pos,
-        "heightIn": height,
-        "weightLb": weight,
-        "archetype": archetype_from_top(fin, sho, ply, dfn, reb),
+        "heightIn": r["height"],
+        "weightLb": r["weight"],
+        "archetype": r["archetype"],
         "badges": [],
         "attributes": {
             "finishing": fin,
@@ -311,139 +462,112 @@ for i, row in df.iterrows():
             "playmaking": ply,
             "defense": dfn,
             "rebounding": reb,
-            "stamina": sta,
+            "stamina": r["sta"],
         },
         "hiddenTraits": {
-            "vision": round(clamp(ply / 100.0, 0.4, 0.9), 2),
-            "bbiq": round(clamp(dfn / 100.0, 0.4, 0.9), 2),
-            "composure": round(clamp(sho / 100.0, 0.35, 0.9), 2),
-            "riskTolerance": round(clamp((row.get("usageProxyPer36") or 0) * 2, 0.2, 0.8), 2),
-            "aggressionBias": round(clamp(fin / 100.0, 0.35, 0.9), 2),
-        },
-        "contract": {
-            "yearsRemaining": 1,
-            "salary": 100000,
+            "vision": round(r["vision"], 2),
+            "bbiq": round(r["bbiq"], 2),
+            "composure": round(r["composure"], 2),
+            "riskTolerance": round(r["riskTolerance"], 2),
+            "aggressionBias": round(r["aggressionBias"], 2),
         },
+        "contract": CONTRACT,
         "athleticProfile": {
-            "speed": speed,
-            "acceleration": acceleration,
-            "lateralQuickness": lateral,
-            "vertical": vertical,
-            "strength": strength,
-            "wingspanIn": wingspan,
+            "speed": r["speed"],
+            "acceleration": r["acceleration"],
+            "lateralQuickness": r["lateral"],
+            "vertical": r["vertical"],
+            "strength": r["strength"],
+            "wingspanIn": r["wingspan"],
         },
         "shootingProfile": {
-            "rim": {"rating": int(rim_rating.iloc[i]), "tendency": round(rim_share, 2)},
-            "midRange": {"rating": int(mid_rating.iloc[i]), "tendency": round(mid_share, 2)},
-            "threePoint": {"rating": int(three_rating.iloc[i]), "tendency": round(three_share, 2)},
-            "offDribble": int(round(0.6 * sho + 0.4 * ply)),
+            "rim": {"rating": r["rim_rating"], "tendency": round(r["rim_share"], 2)},
+            "midRange": {"rating": r["mid_rating"], "tendency": round(r["mid_share"], 2)},
+            "threePoint": {"rating": r["three_rating"], "tendency": round(r["three_share"], 2)},
+            "offDribble": r["offDribble"],
             "catchAndShoot": sho,
-            "shotDiscipline": discipline,
+            "shotDiscipline": r["discipline"],
         },
         "defenseProfile": {
             "onBall": dfn,
-            "helpDefense": int(round((dfn + reb) / 2)),
-            "stealTiming": int(stl_rating.iloc[i]),
-            "blockTiming": int(blk_rating.iloc[i]),
+            "helpDefense": r["helpDefense"],
+            "stealTiming": r["stl_rating"],
+            "blockTiming": r["blk_rating"],
             "closeoutControl": dfn,
-            "foulTendency": round(foul_tendency, 2),
+            "foulTendency": round(r["foul_tendency"], 2),
         },
         "mentalState": {
-            "confidenceBaseline": round(clamp(sho / 100.0, 0.35, 0.85), 2),
-            "pressureHandling": round(clamp((dfn + fin) / 200.0 + (clutch_rate * 0.2), 0.35, 0.92), 2),
-            "clutchFactor": round(clamp((ply + sho) / 200.0 + (clutch_rate * 0.35), 0.3, 0.9), 2),
+            "confidenceBaseline": round(r["confidenceBaseline"], 2),
+            "pressureHandling": round(r["pressureHandling"], 2),
+            "clutchFactor": round(r["clutchFactor"], 2),
         },
         "healthProfile": {
-            "durability": sta,
-            "injuryRisk": round(clamp(0.4 - (pct_rank(pd.Series([games])).iloc[0] * 0.3), 0.08, 0.4), 2),
-            "recoveryRate": round(clamp(0.5 + ((sta - 50) / 100.0), 0.4, 0.9), 2),
+            "durability": r["sta"],
+            "injuryRisk": round(r["injuryRisk"], 2),
+            "recoveryRate": round(r["recoveryRate"], 2),
         },
         "tendencies": {
-            "driveBias": round(drive_bias, 2),
-            "pullUpBias": round(pullup_bias, 2),
-            "kickOutBias": round(kickout_bias, 2),
-            "postUpBias": round(postup_bias, 2),
-            "passRiskTolerance": round(pass_risk, 2),
+            "driveBias": round(r["drive_bias"], 2),
+            "pullUpBias": round(r["pullup_bias"], 2),
+            "kickOutBias": round(r["kickout_bias"], 2),
+            "postUpBias": round(r["postup_bias"], 2),
+            "passRiskTolerance": round(r["pass_risk"], 2),
         },
         "roles": {
-            "offensiveRoles": [],
-            "defensiveRoles": [],
-        },
-        "handedness": {
-            "primaryHand": "R",
+            "offensiveRoles": r["offensiveRoles"],
+            "defensiveRoles": r["defensiveRoles"],
         },
+        "handedness": HANDEDNESS,
         "playtypeProfile": {
             "pnrBallhandler": {
-                "frequency": round(clamp(0.12 + (ply / 400.0), 0.05, 0.45), 2),
-                "efficiency": round(clamp((ply + fin) / 200.0, 0.35, 0.85), 2),
+                "frequency": round(r["pnrBh_freq"], 2),
+                "efficiency": round(r["pnrBh_eff"], 2),
             },
             "pnrRollMan": {
-                "frequency": round(clamp(0.05 + (reb / 400.0), 0.02, 0.35), 2),
-                "efficiency": round(clamp((fin + reb) / 200.0, 0.35, 0.85), 2),
+                "frequency": round(r["pnrRoll_freq"], 2),
+                "efficiency": round(r["finReb_eff"], 2),
             },
             "spotUp": {
-                "frequency": round(clamp(0.08 + (sho / 500.0), 0.05, 0.35), 2),
-                "efficiency": round(clamp(sho / 100.0, 0.3, 0.8), 2),
+                "frequency": round(r["spotUp_freq"], 2),
+                "efficiency": round(r["spotUp_eff"], 2),
             },
             "isolation": {
-                "frequency": round(clamp(0.06 + (fin / 500.0), 0.05, 0.3), 2),
-                "efficiency": round(clamp((fin + sho) / 200.0 + (clutch_rate * 0.15), 0.3, 0.85), 2),
+                "frequency": round(r["iso_freq"], 2),
+                "efficiency": round(r["iso_eff"], 2),
             },
             "postUp": {
-                "frequency": round(clamp(0.05 + (postup_bias * 0.3), 0.02, 0.35), 2),
-                "efficiency": round(clamp((fin + reb) / 200.0, 0.35, 0.85), 2),
+                "frequency": round(r["postUp_freq"], 2),
+                "efficiency": round(r["finReb_eff"], 2),
             },
             "transition": {
-                "frequency": round(clamp(0.06 + (sta / 600.0) + (trans_rate * 0.5), 0.05, 0.5), 2),
-                "efficiency": round(clamp((fin + sta) / 200.0, 0.35, 0.85), 2),
+                "frequency": round(r["trans_freq"], 2),
+                "efficiency": round(r["trans_eff"], 2),
             },
         },
         "seasonState": {
-            "fatigueCurrent": round(clamp((mpg / 40.0) * 0.35, 0.05, 0.35), 2),
-            "minutesLoad7d": int(round(mpg * 3.5)),
-            "minutesLoadSeason": int(round(minutes_est)) if minutes_est is not None else int(round(mpg * games)),
-            "injuryStatus": {
-                "isInjured": False,
-                "type": None,
-                "severity": 0,
-                "expectedDaysOut": 0,
-                "playingLimited": False,
-            },
+            "fatigueCurrent": round(r["fatigue"], 2),
+            "minutesLoad7d": r["minutesLoad7d"],
+            "minutesLoadSeason": r["minutesLoadSeason"],
+            "injuryStatus": INJURY_STATUS,
         },
         "decisionTuning": {
-            "processingSpeed": round(clamp(ply / 100.0, 0.4, 0.95), 2),
-            "consistency": round(clamp(ovr.iloc[i] / 100.0, 0.4, 0.95), 2),
+            "processingSpeed": round(r["processingSpeed"], 2),
+            "consistency": round(r["consistency"], 2),
         },
-    })
-
-    # roles (post-build to use ratings)
-    if players[-1]["attributes"]["playmaking"] >= 80:
-        players[-1]["roles"]["offensiveRoles"].append("PrimaryBallhandler")
-    else:
-        players[-1]["roles"]["offensiveRoles"].append("SecondaryBallhandler")
-
-    if players[-1]["attributes"]["shooting"] >= 80:
-        players[-1]["roles"]["offensiveRoles"].append("SpotUp")
-
-    if players[-1]["attributes"]["finishing"] >= 80:
-        players[-1]["roles"]["offensiveRoles"].append("TransitionFinisher")
+    }
 
-    if players[-1]["attributes"]["rebounding"] >= 80 or pos in ("C", "F"):
-        players[-1]["roles"]["offensiveRoles"].append("Roller")
 
-    if players[-1]["attributes"]["defense"] >= 80:
-        if pos == "G":
-            players[-1]["roles"]["defensiveRoles"].append("PointOfAttack")
-        else:
-            players[-1]["roles"]["defensiveRoles"].append("RimProtector")
-    else:
-        players[-1]["roles"]["defensiveRoles"].append("Helper")
+players = [player_record(r) for r in out.to_dict(orient="records")]
 
 # ---------- write ----------
 
 OUT.parent.mkdir(parents=True, exist_ok=True)
-with open(OUT, "w", encoding="utf-8") as f:
-    json.dump(players, f, indent=2)
+if orjson is not None:
+    # same 2-space layout; non-ascii names stay utf-8 and a missing value is written as null
+    OUT.write_bytes(orjson.dumps(players, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+else:
+    with open(OUT, "w", encoding="utf-8") as f:
+        json.dump(players, f, indent=2)
 
 print(f"Wrote {len(players)} players to {OUT}")
 
@@ -25,11 +25,14 @@ Run:
 
 from __future__ import annotations
 import argparse
-import csv
 import os
 import re
 import shutil
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
 
 RAW_DIR = "raw_data"
 
@@ -41,11 +44,21 @@ ID_MAP = "players_id_map.csv"
 
 TOT_TOKEN = "TOT"
 
+RE_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+RE_UNDER_RUN = re.compile(r"_+")
+
+# consolidated value columns per phase (playerId is re-keyed)
+P1_COLS = ["g", "mpg", "starterFlag", "usageProxyPer36"]
+P2S_COLS = ["fg", "fga", "fgPct", "fg3", "fg3a", "fg3Pct", "fg2", "fg2a", "fg2Pct", "ft", "fta", "ftPct", "pts"]
+P2B_COLS = ["orb", "trb", "ast", "stl", "blk", "tov", "pf"]
+
 
+# team splits + TOT repeat each name, so most calls are cache hits
+@lru_cache(maxsize=None)
 def slugify(s: str) -> str:
     s = (s or "").strip().lower()
-    s = re.sub(r"[^a-z0-9]+", "_", s)
-    s = re.sub(r"_+", "_", s).strip("_")
+    s = RE_NON_ALNUM.sub("_", s)
+    s = RE_UNDER_RUN.sub("_", s).strip("_")
     return s
 
 
@@ -55,40 +68,20 @@ def backup(path: str) -> None:
         shutil.copy2(path, bak)
 
 
-def read_csv(path: str) -> Tuple[List[str], List[dict]]:
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        r = csv.DictReader(f)
-        headers = r.fieldnames or []
-        rows = list(r)
-    return headers, rows
+def read_csv(path: str) -> pd.DataFrame:
+    # parsed in C; every cell stays a str and blanks stay "" (no NaN)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, na_filter=False, encoding="utf-8")
 
 
-def write_csv(path: str, headers: List[str], rows: List[dict]) -> None:
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        for row in rows:
-            w.writerow({h: row.get(h, "") for h in headers})
+def write_csv(path: str, headers: List[str], df: pd.DataFrame) -> None:
+    # missing columns/cells -> "", CRLF line endings as csv.DictWriter wrote them
+    df = df.reindex(columns=headers).fillna("")
+    df.to_csv(path, index=False, encoding="utf-8", lineterminator="\r\n")
 
 
-def to_float(x: str) -> Optional[float]:
-    x = (x or "").strip().replace("%", "")
-    if x == "":
-        return None
-    try:
-        return float(x)
-    except ValueError:
-        return None
-
-
-def to_int(x: str) -> Optional[int]:
-    x = (x or "").strip()
-    if x == "":
-        return None
-    try:
-        return int(float(x))
-    except ValueError:
-        return None
+def to_num(s: pd.Series) -> pd.Series:
+    # column form of a lenient float(): "%" dropped, blank/unparseable -> NaN
+    return pd.to_numeric(s.str.strip().str.replace("%", "", regex=False), errors="coerce")
 
 
 def percent_to_0_100(val: str) -> str:
@@ -104,67 +97,63 @@ def percent_to_0_100(val: str) -> str:
     return f"{x:.2f}"
 
 
-def pick_current_team(rows_phase0: List[dict], rows_phase1: List[dict]) -> str:
+def index_by_id(df: pd.DataFrame, cols: List[str]) -> pd.DataFrame:
+    # rows keyed by stripped old playerId (blank ids dropped, a repeated id keeps its last row);
+    # columns the file lacks come back as ""
+    df = df.assign(oid=df["playerId"].str.strip())
+    df = df[df["oid"] != ""].drop_duplicates("oid", keep="last").set_index("oid")
+    return df.reindex(columns=cols, fill_value="")
+
+
+def pick_current_team(rel0: pd.DataFrame, p1_by_id: pd.DataFrame) -> pd.Series:
     """
-    Pick current team for a player from non-TOT team rows.
+    Pick current team per player (name slug) from non-TOT team rows.
     Rule: max games (phase1 g), tie-breaker: max mpg, else first non-TOT.
+    Players without a non-TOT team fall back to their first non-empty teamId.
     """
-    # Map old playerId -> (g, mpg)
-    p1 = {}
-    for r in rows_phase1:
-        pid = (r.get("playerId") or "").strip()
-        g = to_float(r.get("g", "")) or 0.0
-        mpg = to_float(r.get("mpg", "")) or 0.0
-        p1[pid] = (g, mpg)
-
-    best_team = ""
-    best_key = (-1.0, -1.0)  # (g, mpg)
-
-    for r0 in rows_phase0:
-        team = (r0.get("teamId") or "").strip()
-        if team.upper() == TOT_TOKEN:
-            continue
-        pid = (r0.get("playerId") or "").strip()
-        g, mpg = p1.get(pid, (0.0, 0.0))
-        key = (g, mpg)
-        if key > best_key:
-            best_key = key
-            best_team = team
+    p1 = p1_by_id.reindex(rel0["oid"])
+    rows = rel0.assign(
+        g=to_num(p1["g"]).fillna(0.0).to_numpy(),
+        mpg=to_num(p1["mpg"]).fillna(0.0).to_numpy(),
+    )
+
+    # stable sort: equal (g, mpg) keeps the first row, as the strict > scan did
+    ranked = rows[~rows["is_tot"]].sort_values(["g", "mpg"], ascending=False, kind="stable")
+    best = ranked.drop_duplicates("slug").set_index("slug")["team"]
 
     # fallback
-    if not best_team:
-        for r0 in rows_phase0:
-            team = (r0.get("teamId") or "").strip()
-            if team:
-                return team
-    return ""
+    first = rows[rows["team"] != ""].drop_duplicates("slug").set_index("slug")["team"]
+    best = best[best != ""]
+    return best.combine_first(first)
+
 
+def consolidate(rel: pd.DataFrame, tot_ids: pd.Series, max_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    One row per player from a phase's team rows: the TOT row if the phase has it, else the first row.
+    With max_col, a player without any TOT row takes the row with the largest max_col instead
+    (first on ties).
+    """
+    has_tot = rel["slug"].isin(tot_ids.index)
+    is_tot_row = rel["oid"].eq(rel["slug"].map(tot_ids))
+    key = to_num(rel[max_col]).fillna(0.0).where(~has_tot, 0.0) if max_col else 0.0
+    ranked = rel.assign(_tot=is_tot_row, _key=key).sort_values(["_tot", "_key"], ascending=False, kind="stable")
+    return ranked.drop_duplicates("slug").set_index("slug")
 
-def weighted_merge_numeric(rows: List[dict], weight_field: str, fields: List[str]) -> dict:
+
+def weighted_merge_numeric(rel: pd.DataFrame, weight_field: str, fields: List[str]) -> pd.DataFrame:
     """
-    Weighted merge for numeric fields across team rows (used only if TOT row missing).
-    weights: rows[weight_field] numeric (e.g., games)
+    Weighted merge for numeric fields across each player's team rows (used only if TOT row missing).
+    weights: rel[weight_field] numeric (e.g., games); rows with weight <= 0 are skipped.
     For percents we generally do weighted average too.
     """
-    total_w = 0.0
-    acc = {f: 0.0 for f in fields}
-    for r in rows:
-        w = to_float(r.get(weight_field, "")) or 0.0
-        if w <= 0:
-            continue
-        total_w += w
-        for f in fields:
-            v = to_float(r.get(f, ""))
-            if v is None:
-                continue
-            acc[f] += v * w
-
-    out = {}
+    w = to_num(rel[weight_field]).fillna(0.0)
+    w = w.where(w > 0, 0.0)
+    total_w = w.groupby(rel["slug"], sort=False).sum()
+
+    out = pd.DataFrame(index=total_w.index)
     for f in fields:
-        if total_w > 0:
-            out[f] = f"{(acc[f] / total_w):.3f}"
-        else:
-            out[f] = ""
+        acc = (to_num(rel[f]) * w).groupby(rel["slug"], sort=False).sum()
+        out[f] = (acc / total_w).map("{:.3f}".format).where(total_w > 0, "")
     return out
 
 
@@ -185,177 +174,96 @@ def main() -> None:
         if not os.path.exists(p):
             raise FileNotFoundError(f"Missing required file: {p}")
 
-    p0_h, p0_rows = read_csv(p0_path)
-    p1_h, p1_rows = read_csv(p1_path)
-    p2s_h, p2s_rows = read_csv(p2s_path)
-    p2b_h, p2b_rows = read_csv(p2b_path)
+    p0 = read_csv(p0_path)
 
     # index rows by old playerId
-    p0_by_id: Dict[str, dict] = {r["playerId"].strip(): r for r in p0_rows if (r.get("playerId") or "").strip()}
-    p1_by_id: Dict[str, dict] = {r["playerId"].strip(): r for r in p1_rows if (r.get("playerId") or "").strip()}
-    p2s_by_id: Dict[str, dict] = {r["playerId"].strip(): r for r in p2s_rows if (r.get("playerId") or "").strip()}
-    p2b_by_id: Dict[str, dict] = {r["playerId"].strip(): r for r in p2b_rows if (r.get("playerId") or "").strip()}
-
-    # group old ids by playerName slug
-    groups: Dict[str, List[str]] = {}
-    for r in p0_rows:
-        pid = (r.get("playerId") or "").strip()
-        name = (r.get("playerName") or "").strip()
-        if not pid or not name:
-            continue
-        key = slugify(name)
-        groups.setdefault(key, []).append(pid)
-
-    # build stable team-independent playerIds with collision suffix
-    stable_ids: Dict[str, str] = {}  # nameSlug -> stable playerId (with collision)
-    used_ids: Dict[str, int] = {}
-
-    def make_stable_id(name_slug: str) -> str:
-        base = f"player_{name_slug}"
-        n = used_ids.get(base, 0) + 1
-        used_ids[base] = n
-        return base if n == 1 else f"{base}_{n}"
-
-    # output consolidated rows
-    new_p0_rows = []
-    new_p1_rows = []
-    new_p2s_rows = []
-    new_p2b_rows = []
-    id_map_rows = []
-
-    # helper: choose TOT row id if present in group
-    def pick_tot_id(old_ids: List[str]) -> Optional[str]:
-        for oid in old_ids:
-            team = (p0_by_id.get(oid, {}).get("teamId") or "").strip().upper()
-            if team == TOT_TOKEN:
-                return oid
-        return None
-
-    for name_slug, old_ids in groups.items():
-        # stable playerId for this name_slug group
-        # (if same slug appears for two different people, collision handler kicks in)
-        if name_slug not in stable_ids:
-            stable_ids[name_slug] = make_stable_id(name_slug)
-        new_pid = stable_ids[name_slug]
-
-        # collect related rows
-        related_p0 = [p0_by_id[oid] for oid in old_ids if oid in p0_by_id]
-        related_p1 = [p1_by_id[oid] for oid in old_ids if oid in p1_by_id]
-        related_p2s = [p2s_by_id[oid] for oid in old_ids if oid in p2s_by_id]
-        related_p2b = [p2b_by_id[oid] for oid in old_ids if oid in p2b_by_id]
-
-        # determine "current team" (non-TOT)
-        current_team = pick_current_team(related_p0, related_p1)
-
-        # choose base identity row (prefer non-TOT for pos/team, but stats prefer TOT)
-        name = (related_p0[0].get("playerName") or "").strip() if related_p0 else ""
-        pos = ""
-        # prefer a non-empty pos from non-TOT row, else any
-        for r0 in related_p0:
-            if (r0.get("teamId") or "").strip().upper() != TOT_TOKEN and (r0.get("pos") or "").strip():
-                pos = (r0.get("pos") or "").strip()
-                break
-        if not pos:
-            for r0 in related_p0:
-                if (r0.get("pos") or "").strip():
-                    pos = (r0.get("pos") or "").strip()
-                    break
-
-        season_key = f"{name_slug}|{current_team}"
-
-        # ----- Consolidate Phase 1 + 2 using TOT if exists -----
-        tot_id = pick_tot_id(old_ids)
-
-        def pick_row(prefer_tot: bool, rel: List[dict], by_id: Dict[str, dict]) -> Optional[dict]:
-            if prefer_tot and tot_id and tot_id in by_id:
-                return by_id[tot_id]
-            return rel[0] if rel else None
-
-        # phase1 consolidated
-        r1 = pick_row(True, related_p1, p1_by_id)
-        if r1 is None and related_p1:
-            r1 = related_p1[0]
-
-        # if no TOT row exists but multiple team rows exist, weighted merge via games
-        if (tot_id is None) and len(related_p1) > 1:
-            # merge mpg and usageProxyPer36 weighted by games
-            merged = weighted_merge_numeric(related_p1, "g", ["mpg", "usageProxyPer36"])
-            # games = sum games
-            gsum = sum((to_int(r.get("g", "")) or 0) for r in related_p1)
-            starter = ""  # unreliable without GS; keep blank
-            r1_out = {"playerId": new_pid, "g": str(gsum), "mpg": merged["mpg"], "starterFlag": starter, "usageProxyPer36": merged["usageProxyPer36"]}
-        else:
-            r1_out = {
-                "playerId": new_pid,
-                "g": (r1.get("g") if r1 else ""),
-                "mpg": (r1.get("mpg") if r1 else ""),
-                "starterFlag": (r1.get("starterFlag") if r1 else ""),
-                "usageProxyPer36": (r1.get("usageProxyPer36") if r1 else ""),
-            }
-
-        # phase2 shooting consolidated
-        r2s = pick_row(True, related_p2s, p2s_by_id)
-        if (tot_id is None) and len(related_p2s) > 1:
-            # weighted merge per-game rates by games (approx)
-            merged = weighted_merge_numeric(related_p2s, "fga", ["fgPct","fg3Pct","fg2Pct","ftPct"])  # fallback
-            # for counting per-game fields, weight by games
-            # Better: just keep the row with max fga as "main sample" if no TOT
-            r2s = max(related_p2s, key=lambda r: to_float(r.get("fga","")) or 0.0)
-
-        # phase2 box consolidated
-        r2b = pick_row(True, related_p2b, p2b_by_id)
-        if (tot_id is None) and len(related_p2b) > 1:
-            r2b = max(related_p2b, key=lambda r: to_float(r.get("trb","")) or 0.0)
-
-        # build phase0 consolidated
-        p0_out = {"playerId": new_pid, "playerName": name, "teamId": current_team, "pos": pos, "seasonKey": season_key}
-
-        # build phase2 outputs
-        def get(r: Optional[dict], k: str) -> str:
-            return "" if r is None else (r.get(k, "") or "")
-
-        p2s_out = {
-            "playerId": new_pid,
-            "fg": get(r2s,"fg"), "fga": get(r2s,"fga"), "fgPct": percent_to_0_100(get(r2s,"fgPct")),
-            "fg3": get(r2s,"fg3"), "fg3a": get(r2s,"fg3a"), "fg3Pct": percent_to_0_100(get(r2s,"fg3Pct")),
-            "fg2": get(r2s,"fg2"), "fg2a": get(r2s,"fg2a"), "fg2Pct": percent_to_0_100(get(r2s,"fg2Pct")),
-            "ft": get(r2s,"ft"), "fta": get(r2s,"fta"), "ftPct": percent_to_0_100(get(r2s,"ftPct")),
-            "pts": get(r2s,"pts"),
-        }
-
-        p2b_out = {
-            "playerId": new_pid,
-            "orb": get(r2b,"orb"), "trb": get(r2b,"trb"), "ast": get(r2b,"ast"),
-            "stl": get(r2b,"stl"), "blk": get(r2b,"blk"), "tov": get(r2b,"tov"),
-            "pf": get(r2b,"pf"),
-        }
-
-        new_p0_rows.append(p0_out)
-        new_p1_rows.append(r1_out)
-        new_p2s_rows.append(p2s_out)
-        new_p2b_rows.append(p2b_out)
-        id_map_rows.append({"playerId": new_pid, "playerName": name, "seasonKey": season_key})
-
-    # ensure headers include seasonKey on phase0
-    if "seasonKey" not in p0_h:
-        p0_h = p0_h + ["seasonKey"]
+    p0_by_id = index_by_id(p0, ["playerName", "teamId", "pos"])
+    p1_by_id = index_by_id(read_csv(p1_path), P1_COLS)
+    p2s_by_id = index_by_id(read_csv(p2s_path), P2S_COLS)
+    p2b_by_id = index_by_id(read_csv(p2b_path), P2B_COLS)
+
+    # group old ids by playerName slug (one member row per phase0 row, in file order)
+    pid = p0["playerId"].str.strip()
+    name = p0["playerName"].str.strip()
+    keep = (pid != "") & (name != "")
+    members = pd.DataFrame({"slug": name[keep].map(slugify), "oid": pid[keep]})
+    slugs = pd.Index(members["slug"].unique())
+
+    # stable team-independent playerIds (the slug is the group key, so it is unique already)
+    new_pid = "player_" + slugs.to_series(index=slugs)
+
+    # collect related rows (members joined to each phase; rows keep member order)
+    rel0 = members.join(p0_by_id, on="oid", how="inner")
+    rel0["team"] = rel0["teamId"].str.strip()
+    rel0["is_tot"] = rel0["team"].str.upper() == TOT_TOKEN
+    rel1 = members.join(p1_by_id, on="oid", how="inner")
+    rel2s = members.join(p2s_by_id, on="oid", how="inner")
+    rel2b = members.join(p2b_by_id, on="oid", how="inner")
+
+    # determine "current team" (non-TOT)
+    current_team = pick_current_team(rel0, p1_by_id).reindex(slugs, fill_value="")
+
+    # identity: name from the first row; prefer a non-empty pos from non-TOT row, else any
+    player_name = rel0.drop_duplicates("slug").set_index("slug")["playerName"].str.strip().reindex(slugs)
+    with_pos = rel0.assign(pos=rel0["pos"].str.strip())
+    with_pos = with_pos[with_pos["pos"] != ""].sort_values("is_tot", kind="stable")
+    pos = with_pos.drop_duplicates("slug").set_index("slug")["pos"].reindex(slugs, fill_value="")
+
+    season_key = slugs.to_series(index=slugs) + "|" + current_team
+
+    # ----- Consolidate Phase 1 + 2 using TOT if exists -----
+    tot_ids = rel0[rel0["is_tot"]].drop_duplicates("slug").set_index("slug")["oid"]
+
+    # phase1 consolidated
+    r1 = consolidate(rel1, tot_ids).reindex(slugs)[P1_COLS]
+
+    # if no TOT row exists but multiple team rows exist, weighted merge via games
+    n_rows = rel1.groupby("slug", sort=False).size()
+    merge_slugs = n_rows.index[(n_rows > 1) & ~n_rows.index.isin(tot_ids.index)]
+    if len(merge_slugs):
+        rel_m = rel1[rel1["slug"].isin(merge_slugs)]
+        # merge mpg and usageProxyPer36 weighted by games
+        merged = weighted_merge_numeric(rel_m, "g", ["mpg", "usageProxyPer36"])
+        # games = sum games
+        gsum = np.trunc(to_num(rel_m["g"])).fillna(0).astype(int).groupby(rel_m["slug"], sort=False).sum()
+        r1.loc[merged.index, "g"] = gsum.astype(str)
+        r1.loc[merged.index, ["mpg", "usageProxyPer36"]] = merged
+        r1.loc[merged.index, "starterFlag"] = ""  # unreliable without GS; keep blank
+
+    # phase2 shooting consolidated
+    # (no TOT: keep the row with max fga as "main sample")
+    r2s = consolidate(rel2s, tot_ids, max_col="fga").reindex(slugs)[P2S_COLS].fillna("")
+    for c in ["fgPct", "fg3Pct", "fg2Pct", "ftPct"]:
+        r2s[c] = r2s[c].map(percent_to_0_100)
+
+    # phase2 box consolidated
+    r2b = consolidate(rel2b, tot_ids, max_col="trb").reindex(slugs)[P2B_COLS]
+
+    # build phase0 consolidated
+    p0_out = pd.DataFrame({
+        "playerId": new_pid,
+        "playerName": player_name,
+        "teamId": current_team,
+        "pos": pos,
+        "seasonKey": season_key,
+    })
 
     # write backups + overwrite
     for path in [p0_path, p1_path, p2s_path, p2b_path]:
         backup(path)
 
-    write_csv(p0_path, ["playerId","playerName","teamId","pos","seasonKey"], new_p0_rows)
-    write_csv(p1_path, ["playerId","g","mpg","starterFlag","usageProxyPer36"], new_p1_rows)
-    write_csv(p2s_path, ["playerId","fg","fga","fgPct","fg3","fg3a","fg3Pct","fg2","fg2a","fg2Pct","ft","fta","ftPct","pts"], new_p2s_rows)
-    write_csv(p2b_path, ["playerId","orb","trb","ast","stl","blk","tov","pf"], new_p2b_rows)
+    write_csv(p0_path, ["playerId","playerName","teamId","pos","seasonKey"], p0_out)
+    write_csv(p1_path, ["playerId"] + P1_COLS, r1.assign(playerId=new_pid))
+    write_csv(p2s_path, ["playerId"] + P2S_COLS, r2s.assign(playerId=new_pid))
+    write_csv(p2b_path, ["playerId"] + P2B_COLS, r2b.assign(playerId=new_pid))
 
     # mapping file (backup if exists)
     if os.path.exists(map_path):
         backup(map_path)
-    write_csv(map_path, ["playerId","playerName","seasonKey"], id_map_rows)
+    write_csv(map_path, ["playerId","playerName","seasonKey"], p0_out)
 
     print("✅ Consolidation complete.")
-    print(f"- Deduped to {len(new_p0_rows)} players.")
+    print(f"- Deduped to {len(p0_out)} players.")
     print(f"- Team splits removed; TOT used where available.")
     print(f"- teamId set to current team (picked from non-TOT rows).")
     print(f"- Percent columns normalized to 0–100.")
@@ -1,17 +1,63 @@
 #!/usr/bin/env python3
 import argparse
+import csv
 import json
+import multiprocessing as mp
+import os
+from collections import deque
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-import pandas as pd
+from typing import Any, Dict, List
 
-def safe_get(d: Optional[Dict[str, Any]], *keys, default=None):
-    cur = d
-    for k in keys:
-        if not isinstance(cur, dict):
-            return default
-        cur = cur.get(k)
-    return cur if cur is not None else default
+try:
+    import orjson  # optional: C parser, several times faster than json.load on the game files
+except ImportError:
+    orjson = None
+
+# output tables, in the order parse_game_file returns them; rows are plain tuples in column order
+TABLES = {
+    "games": ("pbp_games.csv", [
+        "source_file", "game_id", "sr_game_id", "reference_game_id", "status", "coverage", "scheduled_utc",
+        "duration", "attendance", "lead_changes", "times_tied", "entry_mode", "track_on_court",
+        "season_id", "season_year", "season_type", "season_name",
+        "home_team_id", "home_team_sr_id", "home_team_ref", "home_team_alias", "home_team_name",
+        "home_team_market", "home_points_final",
+        "away_team_id", "away_team_sr_id", "away_team_ref", "away_team_alias", "away_team_name",
+        "away_team_market", "away_points_final", "tz_venue", "tz_home", "tz_away",
+    ]),
+    "events": ("pbp_events.csv", [
+        "game_id", "period_number", "period_type", "event_id", "event_number", "sequence",
+        "created_utc", "updated_utc", "wall_clock_utc", "clock", "clock_decimal", "event_type", "description",
+        "home_points", "away_points", "attribution_team_id", "attribution_team_sr_id", "attribution_team_name",
+        "possession_team_id", "possession_team_sr_id", "possession_team_name", "turnover_type", "attempt",
+        "duration", "loc_x", "loc_y", "action_area", "qualifiers_joined", "source_file",
+    ]),
+    "stats": ("pbp_event_stats.csv", [
+        "game_id", "event_id", "stat_idx", "stat_type", "team_id", "team_sr_id", "team_ref", "team_name",
+        "player_id", "player_sr_id", "player_ref", "player_name", "jersey_number", "made", "points",
+        "shot_type", "shot_type_desc", "shot_distance", "rebound_type", "free_throw_type", "three_point_shot",
+        "source_file",
+    ]),
+    "lineups": ("pbp_lineups.csv", [
+        "game_id", "event_id", "period_number", "event_number", "sequence", "side", "lineup_slot_idx",
+        "lineup_team_id", "lineup_team_sr_id", "lineup_team_ref", "lineup_team_name",
+        "player_id", "player_sr_id", "player_ref", "player_name", "jersey_number", "source_file",
+    ]),
+    "qualifiers": ("pbp_qualifiers.csv", [
+        "game_id", "event_id", "qualifier_idx", "qualifier", "value", "source_file",
+    ]),
+    "deleted": ("pbp_deleted_events.csv", [
+        "game_id", "deleted_event_id",
+    ]),
+}
+
+EMPTY: Dict[str, Any] = {}
+
+def sub(d: Dict[str, Any], key: str) -> Dict[str, Any]:
+    # nested object under key, or an empty (shared, never written) dict if it is missing/not an object;
+    # fetched once per block so each field below is a single .get
+    v = d.get(key)
+    return v if isinstance(v, dict) else EMPTY
 
 def as_bool_int(v):
     if v is True:
@@ -20,61 +66,67 @@ def as_bool_int(v):
         return 0
     return None
 
-def parse_game_file(path: Path):
+def load_json(path: Path):
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
     with path.open("r", encoding="utf-8") as f:
-        g = json.load(f)
+        return json.load(f)
+
+def parse_game_file(path: Path):
+    g = load_json(path)
 
     game_id = g.get("id")
+    season, home, away, tz = sub(g, "season"), sub(g, "home"), sub(g, "away"), sub(g, "time_zones")
+
+    # ---------- game row (TABLES["games"] column order) ----------
+    game_row = (
+        path.name,
+        game_id,
+        g.get("sr_id"),
+        g.get("reference"),
+        g.get("status"),
+        g.get("coverage"),
+        g.get("scheduled"),
+        g.get("duration"),
+        g.get("attendance"),
+        g.get("lead_changes"),
+        g.get("times_tied"),
+        g.get("entry_mode"),
+        as_bool_int(g.get("track_on_court")),
+        season.get("id"),
+        season.get("year"),
+        season.get("type"),
+        season.get("name"),
+        home.get("id"),
+        home.get("sr_id"),
+        home.get("reference"),
+        home.get("alias"),
+        home.get("name"),
+        home.get("market"),
+        home.get("points"),
+        away.get("id"),
+        away.get("sr_id"),
+        away.get("reference"),
+        away.get("alias"),
+        away.get("name"),
+        away.get("market"),
+        away.get("points"),
+        tz.get("venue"),
+        tz.get("home"),
+        tz.get("away"),
+    )
 
-    # ---------- game row ----------
-    game_row = {
-        "source_file": path.name,
-        "game_id": game_id,
-        "sr_game_id": g.get("sr_id"),
-        "reference_game_id": g.get("reference"),
-        "status": g.get("status"),
-        "coverage": g.get("coverage"),
-        "scheduled_utc": g.get("scheduled"),
-        "duration": g.get("duration"),
-        "attendance": g.get("attendance"),
-        "lead_changes": g.get("lead_changes"),
-        "times_tied": g.get("times_tied"),
-        "entry_mode": g.get("entry_mode"),
-        "track_on_court": as_bool_int(g.get("track_on_court")),
-        "season_id": safe_get(g, "season", "id"),
-        "season_year": safe_get(g, "season", "year"),
-        "season_type": safe_get(g, "season", "type"),
-        "season_name": safe_get(g, "season", "name"),
-        "home_team_id": safe_get(g, "home", "id"),
-        "home_team_sr_id": safe_get(g, "home", "sr_id"),
-        "home_team_ref": safe_get(g, "home", "reference"),
-        "home_team_alias": safe_get(g, "home", "alias"),
-        "home_team_name": safe_get(g, "home", "name"),
-        "home_team_market": safe_get(g, "home", "market"),
-        "home_points_final": safe_get(g, "home", "points"),
-        "away_team_id": safe_get(g, "away", "id"),
-        "away_team_sr_id": safe_get(g, "away", "sr_id"),
-        "away_team_ref": safe_get(g, "away", "reference"),
-        "away_team_alias": safe_get(g, "away", "alias"),
-        "away_team_name": safe_get(g, "away", "name"),
-        "away_team_market": safe_get(g, "away", "market"),
-        "away_points_final": safe_get(g, "away", "points"),
-        "tz_venue": safe_get(g, "time_zones", "venue"),
-        "tz_home": safe_get(g, "time_zones", "home"),
-        "tz_away": safe_get(g, "time_zones", "away"),
-    }
-
-    events_rows: List[Dict[str, Any]] = []
-    event_stats_rows: List[Dict[str, Any]] = []
-    lineup_rows: List[Dict[str, Any]] = []
-    qualifier_rows: List[Dict[str, Any]] = []
-    deleted_rows: List[Dict[str, Any]] = []
+    events_rows: List[tuple] = []
+    event_stats_rows: List[tuple] = []
+    lineup_rows: List[tuple] = []
+    qualifier_rows: List[tuple] = []
+    deleted_rows: List[tuple] = []
 
     for de in g.get("deleted_events", []) or []:
-        deleted_rows.append({
-            "game_id": game_id,
-            "deleted_event_id": de.get("id")
-        })
+        deleted_rows.append((
+            game_id,
+            de.get("id"),
+        ))
 
     for p in g.get("periods", []) or []:
         pnum = p.get("number")
@@ -87,80 +139,82 @@ def parse_game_file(path: Path):
                 [str(q.get("qualifier")) for q in quals if isinstance(q, dict) and q.get("qualifier")]
             )
 
-            events_rows.append({
-                "game_id": game_id,
-                "period_number": pnum,
-                "period_type": ptype,
-                "event_id": event_id,
-                "event_number": ev.get("number"),
-                "sequence": ev.get("sequence"),
-                "created_utc": ev.get("created"),
-                "updated_utc": ev.get("updated"),
-                "wall_clock_utc": ev.get("wall_clock"),
-                "clock": ev.get("clock"),
-                "clock_decimal": ev.get("clock_decimal"),
-                "event_type": ev.get("event_type"),
-                "description": ev.get("description"),
-                "home_points": ev.get("home_points"),
-                "away_points": ev.get("away_points"),
-                "attribution_team_id": safe_get(ev, "attribution", "id"),
-                "attribution_team_sr_id": safe_get(ev, "attribution", "sr_id"),
-                "attribution_team_name": safe_get(ev, "attribution", "name"),
-                "possession_team_id": safe_get(ev, "possession", "id"),
-                "possession_team_sr_id": safe_get(ev, "possession", "sr_id"),
-                "possession_team_name": safe_get(ev, "possession", "name"),
-                "turnover_type": ev.get("turnover_type"),
-                "attempt": ev.get("attempt"),
-                "duration": ev.get("duration"),
-                "loc_x": safe_get(ev, "location", "coord_x"),
-                "loc_y": safe_get(ev, "location", "coord_y"),
-                "action_area": safe_get(ev, "location", "action_area"),
-                "qualifiers_joined": qualifiers_joined,
-                "source_file": path.name
-            })
+            attribution, possession, location = sub(ev, "attribution"), sub(ev, "possession"), sub(ev, "location")
+            events_rows.append((
+                game_id,
+                pnum,
+                ptype,
+                event_id,
+                ev.get("number"),
+                ev.get("sequence"),
+                ev.get("created"),
+                ev.get("updated"),
+                ev.get("wall_clock"),
+                ev.get("clock"),
+                ev.get("clock_decimal"),
+                ev.get("event_type"),
+                ev.get("description"),
+                ev.get("home_points"),
+                ev.get("away_points"),
+                attribution.get("id"),
+                attribution.get("sr_id"),
+                attribution.get("name"),
+                possession.get("id"),
+                possession.get("sr_id"),
+                possession.get("name"),
+                ev.get("turnover_type"),
+                ev.get("attempt"),
+                ev.get("duration"),
+                location.get("coord_x"),
+                location.get("coord_y"),
+                location.get("action_area"),
+                qualifiers_joined,
+                path.name,
+            ))
 
             # qualifiers normalized
             for qi, q in enumerate(quals):
                 if not isinstance(q, dict):
                     continue
-                qualifier_rows.append({
-                    "game_id": game_id,
-                    "event_id": event_id,
-                    "qualifier_idx": qi,
-                    "qualifier": q.get("qualifier"),
-                    "value": q.get("value"),
-                    "source_file": path.name
-                })
+                qualifier_rows.append((
+                    game_id,
+                    event_id,
+                    qi,
+                    q.get("qualifier"),
+                    q.get("value"),
+                    path.name,
+                ))
 
             # stat objects normalized
             stats = ev.get("statistics") or []
             for si, s in enumerate(stats):
                 if not isinstance(s, dict):
                     continue
-                event_stats_rows.append({
-                    "game_id": game_id,
-                    "event_id": event_id,
-                    "stat_idx": si,
-                    "stat_type": s.get("type"),
-                    "team_id": safe_get(s, "team", "id"),
-                    "team_sr_id": safe_get(s, "team", "sr_id"),
-                    "team_ref": safe_get(s, "team", "reference"),
-                    "team_name": safe_get(s, "team", "name"),
-                    "player_id": safe_get(s, "player", "id"),
-                    "player_sr_id": safe_get(s, "player", "sr_id"),
-                    "player_ref": safe_get(s, "player", "reference"),
-                    "player_name": safe_get(s, "player", "full_name"),
-                    "jersey_number": safe_get(s, "player", "jersey_number"),
-                    "made": s.get("made"),
-                    "points": s.get("points"),
-                    "shot_type": s.get("shot_type"),
-                    "shot_type_desc": s.get("shot_type_desc"),
-                    "shot_distance": s.get("shot_distance"),
-                    "rebound_type": s.get("rebound_type"),
-                    "free_throw_type": s.get("free_throw_type"),
-                    "three_point_shot": s.get("three_point_shot"),
-                    "source_file": path.name
-                })
+                team, player = sub(s, "team"), sub(s, "player")
+                event_stats_rows.append((
+                    game_id,
+                    event_id,
+                    si,
+                    s.get("type"),
+                    team.get("id"),
+                    team.get("sr_id"),
+                    team.get("reference"),
+                    team.get("name"),
+                    player.get("id"),
+                    player.get("sr_id"),
+                    player.get("reference"),
+                    player.get("full_name"),
+                    player.get("jersey_number"),
+                    s.get("made"),
+                    s.get("points"),
+                    s.get("shot_type"),
+                    s.get("shot_type_desc"),
+                    s.get("shot_distance"),
+                    s.get("rebound_type"),
+                    s.get("free_throw_type"),
+                    s.get("three_point_shot"),
+                    path.name,
+                ))
 
             # on_court snapshots (home + away)
             oc = ev.get("on_court") or {}
@@ -173,33 +227,52 @@ def parse_game_file(path: Path):
                 for li, pl in enumerate(players):
                     if not isinstance(pl, dict):
                         continue
-                    lineup_rows.append({
-                        "game_id": game_id,
-                        "event_id": event_id,
-                        "period_number": pnum,
-                        "event_number": ev.get("number"),
-                        "sequence": ev.get("sequence"),
-                        "side": side,
-                        "lineup_slot_idx": li,
-                        "lineup_team_id": lineup_team_id,
-                        "lineup_team_sr_id": team_blob.get("sr_id"),
-                        "lineup_team_ref": team_blob.get("reference"),
-                        "lineup_team_name": team_blob.get("name"),
-                        "player_id": pl.get("id"),
-                        "player_sr_id": pl.get("sr_id"),
-                        "player_ref": pl.get("reference"),
-                        "player_name": pl.get("full_name"),
-                        "jersey_number": pl.get("jersey_number"),
-                        "source_file": path.name
-                    })
+                    lineup_rows.append((
+                        game_id,
+                        event_id,
+                        pnum,
+                        ev.get("number"),
+                        ev.get("sequence"),
+                        side,
+                        li,
+                        lineup_team_id,
+                        team_blob.get("sr_id"),
+                        team_blob.get("reference"),
+                        team_blob.get("name"),
+                        pl.get("id"),
+                        pl.get("sr_id"),
+                        pl.get("reference"),
+                        pl.get("full_name"),
+                        pl.get("jersey_number"),
+                        path.name,
+                    ))
 
     return game_row, events_rows, event_stats_rows, lineup_rows, qualifier_rows, deleted_rows
 
+def parse_game_safe(path: Path):
+    # worker entry point: failures come back as a message so one bad file does not stop the pool
+    try:
+        return parse_game_file(path), None
+    except Exception as ex:
+        return None, str(ex)
+
+def parse_in_order(pool, files: List[Path], window: int):
+    # results in file order with at most `window` files submitted but not yet consumed, so a slow
+    # writer stalls the workers instead of letting parsed games pile up in the parent
+    pending = deque()
+    for fp in files:
+        pending.append(pool.apply_async(parse_game_safe, (fp,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
 def main():
     ap = argparse.ArgumentParser(description="Extract Sportradar WNBA PBP JSONs into normalized CSV tables.")
     ap.add_argument("--in-dir", required=True, help="Folder containing game JSON files.")
     ap.add_argument("--out-dir", required=True, help="Folder to write CSV outputs.")
     ap.add_argument("--glob", default="*.json", help="File glob pattern (default: *.json).")
+    ap.add_argument("--workers", type=int, default=0, help="Parser processes (default: one per CPU; 1 parses in-process).")
     args = ap.parse_args()
 
     in_dir = Path(args.in_dir)
@@ -210,37 +283,43 @@ def main():
     if not files:
         raise SystemExit(f"No files found in {in_dir} matching {args.glob}")
 
-    games = []
-    events = []
-    stats = []
-    lineups = []
-    qualifiers = []
-    deleted = []
-
-    for i, fp in enumerate(files, 1):
-        try:
-            g, e, s, l, q, d = parse_game_file(fp)
-            games.append(g)
-            events.extend(e)
-            stats.extend(s)
-            lineups.extend(l)
-            qualifiers.extend(q)
-            deleted.extend(d)
-        except Exception as ex:
-            print(f"[WARN] Failed {fp.name}: {ex}")
-
-        if i % 25 == 0 or i == len(files):
-            print(f"processed {i}/{len(files)}")
-
-    pd.DataFrame(games).to_csv(out_dir / "pbp_games.csv", index=False)
-    pd.DataFrame(events).to_csv(out_dir / "pbp_events.csv", index=False)
-    pd.DataFrame(stats).to_csv(out_dir / "pbp_event_stats.csv", index=False)
-    pd.DataFrame(lineups).to_csv(out_dir / "pbp_lineups.csv", index=False)
-    pd.DataFrame(qualifiers).to_csv(out_dir / "pbp_qualifiers.csv", index=False)
-    pd.DataFrame(deleted).to_csv(out_dir / "pbp_deleted_events.csv", index=False)
+    workers = args.workers or os.cpu_count() or 1
+    counts = {name: 0 for name in TABLES}
+
+    # the pool is terminated (not drained) if anything below fails; rows are streamed to the six
+    # tables game by game, with at most workers * 4 parsed-or-pending games held at once
+    with ExitStack() as stack:
+        pool = None
+        if workers > 1 and len(files) > 1:
+            pool = stack.enter_context(mp.Pool(workers))
+            results = parse_in_order(pool, files, window=workers * 4)
+        else:
+            results = map(parse_game_safe, files)
+
+        writers = {}
+        for name, (fname, cols) in TABLES.items():
+            f = stack.enter_context((out_dir / fname).open("w", encoding="utf-8", newline=""))
+            writers[name] = csv.writer(f, lineterminator="\n")
+            writers[name].writerow(cols)
+
+        for i, (fp, (parsed, err)) in enumerate(zip(files, results), 1):
+            if err is not None:
+                print(f"[WARN] Failed {fp.name}: {err}")
+            else:
+                g, e, s, l, q, d = parsed
+                for name, rows in zip(TABLES, ([g], e, s, l, q, d)):
+                    writers[name].writerows(rows)
+                    counts[name] += len(rows)
+
+            if i % 25 == 0 or i == len(files):
+                print(f"processed {i}/{len(files)}")
+
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     print("done")
-    print(f"games={len(games)} events={len(events)} stats={len(stats)} lineups={len(lineups)} qualifiers={len(qualifiers)} deleted={len(deleted)}")
+    print(" ".join(f"{name}={n}" for name, n in counts.items()))
 
 if __name__ == "__main__":
     main()